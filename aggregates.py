@@ -0,0 +1,236 @@
+"""Materialized segment x feature aggregates of the catalog.
+
+Every summary table in the dashboard is a mean or share over some slice of
+price segment x one-hot feature. The cube stores counts and sums of rating,
+reviews, growth rate and price for each (segment, feature, flag value) cell,
+so those tables are read from a few hundred numbers instead of re-scanning
+the catalog on every rerun. Two segmentations are kept:
+
+* ``segment``: the five equal-width ``pd.cut(price, bins=5)`` ranges,
+  updated incrementally when rows are appended inside the current range.
+* ``band``: the five price quintile bands used by Product Insights
+  (``price.between(q[i], q[i+1])``, boundaries shared by neighbours), plus
+  each band's 75th-percentile-rating price range. These depend on order
+  statistics and are recomputed from the price and rating columns on append.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import FEATURE_COLUMNS, temp_path
+
+METRICS = ['rating', 'reviews', 'review_growth_rate', 'price']
+SEGMENT_LABELS = ['Budget', 'Economy', 'Mid-Range', 'Premium', 'Luxury']
+AGGREGATE_DIR = os.environ.get("AGGREGATE_DIR", os.path.join(".cache", "aggregates"))
+
+
+def _cells(group_codes, n_groups, flags, values):
+    """Counts and metric sums per (group, feature, flag value): shape (groups, features, 2, 1 + metrics)."""
+    n_features = flags.shape[1]
+    cells = np.zeros((n_groups, n_features, 2, 1 + values.shape[1]))
+    for f in range(n_features):
+        keys = group_codes * 2 + flags[:, f]
+        cells[:, f, :, 0] = np.bincount(keys, minlength=n_groups * 2).reshape(n_groups, 2)
+        for m in range(values.shape[1]):
+            cells[:, f, :, m + 1] = np.bincount(keys, weights=values[:, m], minlength=n_groups * 2).reshape(n_groups, 2)
+    return cells
+
+
+def _arrays(data):
+    flags = (data[FEATURE_COLUMNS].to_numpy() == 1).astype(np.int64)
+    values = data[METRICS].to_numpy(dtype=np.float64)
+    return flags, values
+
+
+def _segment_codes(prices, edges):
+    # pd.cut bins are right-closed: edges[i] < price <= edges[i + 1]
+    codes = np.searchsorted(edges, prices, side='left') - 1
+    return np.clip(codes, 0, len(edges) - 2)
+
+
+def _means(cells):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cells[..., 1:] / cells[..., :1]
+
+
+class AggregateCube:
+    """Count/sum cells over price segment x feature, with views for each dashboard table."""
+
+    def __init__(self, n_rows, price_bounds, edges, segment_cells, quantiles, band_cells, band_price_range):
+        self.n_rows = int(n_rows)
+        # [min, max] price the pd.cut edges were derived from
+        self.price_bounds = price_bounds
+        self.edges = edges
+        self.segment_cells = segment_cells
+        self.quantiles = quantiles
+        self.band_cells = band_cells
+        # (band, [mean, min, max]) of price among the band's top-quartile-rated products
+        self.band_price_range = band_price_range
+
+    @classmethod
+    def build(cls, data):
+        flags, values = _arrays(data)
+        _, edges = pd.cut(data['price'], bins=5, retbins=True, duplicates='drop')
+        segment_codes = _segment_codes(values[:, 3], edges)
+        segment_cells = _cells(segment_codes, len(edges) - 1, flags, values)
+        quantiles, band_cells, band_price_range = cls._bands(data, flags, values)
+        price_bounds = np.array([values[:, 3].min(), values[:, 3].max()]) if len(values) else np.zeros(2)
+        return cls(len(data), price_bounds, edges, segment_cells, quantiles, band_cells, band_price_range)
+
+    @staticmethod
+    def _bands(data, flags, values):
+        price = data['price']
+        quantiles = np.array([price.quantile(0.2 * i) for i in range(6)])
+        band_cells = np.zeros((5, flags.shape[1], 2, 1 + values.shape[1]))
+        band_price_range = np.full((5, 3), np.nan)
+        for b in range(5):
+            mask = price.between(quantiles[b], quantiles[b + 1]).to_numpy()
+            band_cells[b] = _cells(np.zeros(mask.sum(), dtype=np.int64), 1, flags[mask], values[mask])[0]
+            band_rows = data.loc[mask, ['rating', 'price']]
+            top_rated = band_rows[band_rows['rating'] >= band_rows['rating'].quantile(0.75)]['price']
+            if len(top_rated):
+                band_price_range[b] = [top_rated.mean(), top_rated.min(), top_rated.max()]
+        return quantiles, band_cells, band_price_range
+
+    def append(self, data, new_rows):
+        """Fold new_rows (already the tail of data) into the cube.
+
+        Segment cells are updated in place when the new prices fall inside the
+        existing pd.cut range, otherwise the whole cube is rebuilt from data.
+        """
+        new_prices = new_rows['price'].to_numpy(dtype=np.float64)
+        low, high = self.price_bounds
+        # New extremes move every pd.cut edge, so the segment cells must be rebuilt
+        if len(new_rows) and (new_prices.min() < low or new_prices.max() > high):
+            rebuilt = AggregateCube.build(data)
+            self.__dict__.update(rebuilt.__dict__)
+            return self
+        flags, values = _arrays(new_rows)
+        self.segment_cells += _cells(_segment_codes(new_prices, self.edges), len(self.edges) - 1, flags, values)
+        self.quantiles, self.band_cells, self.band_price_range = self._bands(data, *_arrays(data))
+        self.n_rows = len(data)
+        return self
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = temp_path(path, suffix=".tmp.npz")
+        np.savez(tmp_path, **self.__dict__)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    # Whole-catalog views
+
+    def _totals(self):
+        # Every product has each feature either set or not, so feature 0 covers all rows
+        return self.segment_cells[:, 0].sum(axis=1)
+
+    def overall_mean(self, metric):
+        totals = self._totals().sum(axis=0)
+        return totals[1 + METRICS.index(metric)] / totals[0]
+
+    def feature_counts(self):
+        """Number of products with each feature set."""
+        return pd.Series(self.segment_cells[:, :, 1, 0].sum(axis=0), index=FEATURE_COLUMNS)
+
+    def feature_means(self, metric):
+        """Mean of metric over products with each feature set (NaN if none)."""
+        cells = self.segment_cells[:, :, 1].sum(axis=0)
+        return pd.Series(_means(cells)[:, METRICS.index(metric)], index=FEATURE_COLUMNS)
+
+    def feature_performance(self):
+        """Mean rating/reviews/growth/price of products with each feature (0 if none), as in Product Insights."""
+        cells = self.segment_cells[:, :, 1].sum(axis=0)
+        means = np.nan_to_num(_means(cells), nan=0.0).round(2)
+        return pd.DataFrame(means.T, index=METRICS, columns=FEATURE_COLUMNS)
+
+    def segment_performance(self, metrics, labels=True):
+        """Per pd.cut price segment means of metrics, indexed by label or by price interval."""
+        totals = self._totals()
+        present = totals[:, 0] > 0
+        means = _means(totals)[present][:, [METRICS.index(m) for m in metrics]]
+        if labels:
+            index = pd.CategoricalIndex(
+                np.array(SEGMENT_LABELS[:len(totals)])[present],
+                categories=SEGMENT_LABELS[:len(totals)],
+                ordered=True,
+                name='price',
+            )
+        else:
+            index = pd.CategoricalIndex(pd.IntervalIndex.from_breaks(self.edges)[present], name='price')
+        return pd.DataFrame(means, index=index, columns=metrics).round(2)
+
+    def segment_of(self, price):
+        """Label of the pd.cut price segment price falls in, clamped to the outer segments."""
+        return SEGMENT_LABELS[int(_segment_codes(np.array([price], dtype=np.float64), self.edges)[0])]
+
+    # Quintile band views
+
+    def band_of(self, price):
+        """Index of the quintile band price falls in, clamped to the outer bands."""
+        band = np.searchsorted(self.quantiles, price, side='left') - 1
+        return int(np.clip(band, 0, len(self.quantiles) - 2))
+
+    def band_features(self, band):
+        """Per-feature success rate, popularity, price, reviews and growth within a price band."""
+        cells = self.band_cells[band]
+        set_cells = cells[:, 1]
+        means = _means(set_cells)
+        band_size = cells[0].sum(axis=0)[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            popularity = set_cells[:, 0] / band_size * 100
+        return pd.DataFrame({
+            'feature': FEATURE_COLUMNS,
+            'success_rate': means[:, METRICS.index('rating')],
+            'popularity': popularity,
+            'avg_price': means[:, METRICS.index('price')],
+            'review_engagement': means[:, METRICS.index('reviews')],
+            'growth_potential': means[:, METRICS.index('review_growth_rate')],
+        }).sort_values('success_rate', ascending=False)
+
+    def band_mean(self, band, metric):
+        totals = self.band_cells[band, 0].sum(axis=0)
+        return totals[1 + METRICS.index(metric)] / totals[0]
+
+    def band_optimal_price_range(self, band):
+        """Mean/min/max price of the band's products rated in its top quartile."""
+        return pd.Series(self.band_price_range[band], index=['mean', 'min', 'max'])
+
+
+def _prefix_fingerprint(data, n_rows):
+    """Hash of the first n_rows rows of the aggregated columns."""
+    prefix = data[METRICS + FEATURE_COLUMNS].iloc[:n_rows].astype('float64')
+    return hashlib.sha256(pd.util.hash_pandas_object(prefix, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def load_or_build_cube(data, version, aggregate_dir=AGGREGATE_DIR):
+    """Cube for this dataset version: loaded, extended from an earlier version on append, or built."""
+    path = os.path.join(aggregate_dir, f"{version}.npz")
+    if os.path.exists(path):
+        return AggregateCube.load(path)
+
+    cube = None
+    previous = sorted(
+        (os.path.join(aggregate_dir, name) for name in os.listdir(aggregate_dir) if name.endswith(".npz"))
+        if os.path.isdir(aggregate_dir) else [],
+        key=os.path.getmtime,
+    )
+    if previous:
+        candidate = AggregateCube.load(previous[-1])
+        fingerprint_path = previous[-1][:-len(".npz")] + ".fingerprint"
+        if candidate.n_rows <= len(data) and os.path.exists(fingerprint_path):
+            with open(fingerprint_path) as f:
+                if f.read() == _prefix_fingerprint(data, candidate.n_rows):
+                    cube = candidate.append(data, data.iloc[candidate.n_rows:])
+    if cube is None:
+        cube = AggregateCube.build(data)
+
+    cube.save(path)
+    with open(path[:-len(".npz")] + ".fingerprint", "w") as f:
+        f.write(_prefix_fingerprint(data, len(data)))
+    return cube
@@ -0,0 +1,217 @@
+"""Headless batch report runner for candidate products.
+
+Scores every row of a candidate CSV with the same analytics the dashboard
+shows for a single sidebar product: similar catalog products with their
+windowed review trends, predicted demand, price segment placement and the
+Product Insights competitiveness and demand scores. Rows are split into chunks
+that run on a process pool, and each product's report is written to its own
+JSON or Parquet file.
+
+    python batch.py candidates.csv --out reports/
+    python batch.py candidates.csv --out reports/ --format parquet --workers 8 --llm
+
+The candidate CSV needs a ``price`` column and either the one-hot feature
+columns (Cotton, Polyester, Round Neck, ...) or ``material``, ``neck_type``
+and ``sleeve_type`` columns with the sidebar's values. ``review_growth_rate``
+defaults to 0 and ``product_id`` to the row number. Product IDs name the
+report files, so IDs that map to the same file name are rejected up front.
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aggregates import load_or_build_cube
+from catalog_store import FEATURE_COLUMNS, Catalog, catalog_version, load_catalog, load_shared_clean, temp_path
+from forecasting import TRAINING_COLUMNS, predict_distinct
+from insights import make_user_product, product_insights, similar_products
+from llm import LazyGroqClient, convert_numpy_types, stream_chat_completion
+from llm_cache import ResponseCache
+from model_registry import load_or_train
+from prompts import competitive_analysis_messages
+from reviews import load_or_build_reviews
+from similarity_index import load_or_build_index
+
+CHUNK_ROWS = 32
+
+# Per-process state, filled in by _init_worker
+_worker = {}
+
+
+def read_candidates(path):
+    """Candidate products as a frame of product_id plus the training columns."""
+    raw = pd.read_csv(path)
+    if 'price' not in raw.columns:
+        raise ValueError(f"{path} has no 'price' column")
+
+    if all(column in raw.columns for column in FEATURE_COLUMNS):
+        candidates = raw[FEATURE_COLUMNS].astype(int)
+    elif all(column in raw.columns for column in ['material', 'neck_type', 'sleeve_type']):
+        candidates = pd.concat([
+            make_user_product(0, row.material, row.neck_type, row.sleeve_type)[FEATURE_COLUMNS]
+            for row in raw[['material', 'neck_type', 'sleeve_type']].itertuples()
+        ], ignore_index=True)
+    else:
+        raise ValueError(f"{path} needs the one-hot feature columns or material/neck_type/sleeve_type")
+
+    candidates.insert(0, 'price', raw['price'].astype(float))
+    candidates.insert(1, 'review_growth_rate', raw.get('review_growth_rate', pd.Series(0.0, index=raw.index)).astype(float))
+    product_ids = raw['product_id'].astype(str) if 'product_id' in raw.columns else pd.Series(
+        [f"{i:06d}" for i in range(len(raw))], index=raw.index
+    )
+    stems = product_ids.map(_file_stem)
+    duplicated = stems.duplicated(keep=False)
+    if duplicated.any():
+        clashes = sorted(product_ids[duplicated].unique())[:5]
+        raise ValueError(f"{path} has product IDs that share a report file: {', '.join(clashes)}")
+    candidates.insert(0, 'product_id', product_ids)
+    return candidates
+
+
+def prepare_artifacts():
+    """Build (or load) every on-disk artifact once so workers only have to read them."""
+    clean_data, _ = load_catalog(details_columns=[])
+    version = catalog_version()
+    load_or_build_index(clean_data, version)
+    load_or_build_cube(clean_data, version)
+    load_or_build_reviews(version)
+    load_or_train(clean_data, retrain_stale=False)
+
+
+def _init_worker(use_llm):
+    # Workers map the same column files, so the catalog is in memory once per machine
+    clean_data = load_shared_clean()
+    version = catalog_version()
+    model, _ = load_or_train(clean_data, retrain_stale=False)
+    # One tree-evaluation thread per worker; parallelism comes from the pool
+    model.set_params(n_jobs=1)
+    _worker.update(
+        clean_data=clean_data,
+        catalog=Catalog(),
+        index=load_or_build_index(clean_data, version),
+        cube=load_or_build_cube(clean_data, version),
+        review_stats=load_or_build_reviews(version).stats,
+        model=model,
+        llm_client=None,
+    )
+    if use_llm:
+        _worker.update(llm_client=LazyGroqClient(os.environ["GROQ_API_KEY"]), llm_cache=ResponseCache())
+
+
+def _missing_to_none(obj):
+    # NaN (missing text, features no product has) becomes null in JSON and Parquet
+    if isinstance(obj, dict):
+        return {k: _missing_to_none(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_missing_to_none(item) for item in obj]
+    if isinstance(obj, float) and np.isnan(obj):
+        return None
+    return obj
+
+
+def product_report(user_product, predicted_demand, top_n=5):
+    """Report dict for one candidate, from the worker's catalog, index, cube and LLM client."""
+    similar = similar_products(
+        _worker["clean_data"], _worker["catalog"], _worker["index"], user_product, top_n, _worker["review_stats"],
+    )
+    insights = product_insights(_worker["cube"], user_product)
+    segment = insights["user_segment"]
+    segment_performance = insights["segment_performance"]
+
+    report = {
+        "product": user_product.iloc[0].to_dict(),
+        "predicted_demand": float(predicted_demand),
+        "user_segment": segment,
+        "segment_performance": (
+            segment_performance.loc[segment].to_dict() if segment in segment_performance.index else None
+        ),
+        "competitiveness_score": insights["competitiveness_score"],
+        "demand_score": insights["demand_score"],
+        "demand_factors": insights["demand_factors"],
+        "optimal_price_range": insights["optimal_price_range"].to_dict(),
+        "best_features": insights["best_features"].to_dict(orient="records"),
+        "similar_products": similar,
+    }
+    if _worker["llm_client"] is not None:
+        messages = competitive_analysis_messages(similar, user_product)
+        report["competitive_analysis"] = "".join(
+            stream_chat_completion(messages, _worker["llm_cache"], _worker["llm_client"])
+        )
+    return _missing_to_none(convert_numpy_types(report))
+
+
+def _file_stem(product_id):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", product_id)
+
+
+def _output_path(out_dir, product_id, fmt):
+    return os.path.join(out_dir, f"{_file_stem(product_id)}.{fmt}")
+
+
+def write_report(report, path, fmt):
+    tmp_path = temp_path(path)
+    if fmt == "json":
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, default=str)
+    else:
+        pq.write_table(pa.Table.from_pylist([report]), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def run_chunk(candidates, out_dir, fmt, top_n):
+    """Score a chunk of candidate rows and write one report per product; return the written paths."""
+    features = candidates[TRAINING_COLUMNS].to_numpy(dtype=np.float32)
+    predictions = predict_distinct(_worker["model"], features)
+    paths = []
+    for position, product_id in enumerate(candidates['product_id']):
+        user_product = candidates[TRAINING_COLUMNS].iloc[[position]].reset_index(drop=True)
+        report = dict(product_id=product_id, **product_report(user_product, predictions[position], top_n))
+        path = _output_path(out_dir, product_id, fmt)
+        write_report(report, path, fmt)
+        paths.append(path)
+    return paths
+
+
+def run_batch(candidates, out_dir, fmt="json", workers=None, chunk_rows=CHUNK_ROWS, top_n=5, use_llm=False):
+    """Score all candidates on a process pool; return the list of report paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    prepare_artifacts()
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_llm,)) as pool:
+        futures = [
+            pool.submit(run_chunk, candidates.iloc[start:start + chunk_rows], out_dir, fmt, top_n)
+            for start in range(0, len(candidates), chunk_rows)
+        ]
+        for future in as_completed(futures):
+            paths.extend(future.result())
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of candidate products headlessly.")
+    parser.add_argument("candidates", help="CSV of candidate products")
+    parser.add_argument("--out", required=True, help="directory for the per-product reports")
+    parser.add_argument("--format", choices=["json", "parquet"], default="json")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--top-n", type=int, default=5, help="similar products per report")
+    parser.add_argument("--llm", action="store_true",
+                        help="add a Groq competitive analysis to each report (needs GROQ_API_KEY)")
+    args = parser.parse_args(argv)
+
+    candidates = read_candidates(args.candidates)
+    start = time.perf_counter()
+    paths = run_batch(candidates, args.out, args.format, args.workers, args.chunk_rows, args.top_n, args.llm)
+    elapsed = time.perf_counter() - start
+    print(f"wrote {len(paths)} reports to {args.out} in {elapsed:.1f}s ({len(paths) / elapsed:.1f} products/s)")
+
+
+if __name__ == "__main__":
+    main()
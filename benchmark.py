@@ -0,0 +1,310 @@
+"""Benchmarks for the dashboard's analytic stages on synthetic catalogs.
+
+Generates a scrape-shaped ``product_data_with_details.csv`` (titles, ₹
+prices, product_details tokens, "5★ - 8 August 2024; ..." review strings)
+of the requested size, derives the cleaned CSV from it with the ETL, and
+runs every stage headless in a scratch directory, with the Groq client
+replaced by a stub. Each stage's wall time and peak resident memory (sampled
+from /proc every few milliseconds, so the measurement itself costs nothing
+noticeable) are saved as JSON so runs on different commits can be compared.
+
+    python benchmark.py                              # 10k, 100k and 1M products
+    python benchmark.py --sizes 10000 50000 --out results.json
+    python benchmark.py --compare baseline.json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import CLEAN_CSV, DETAILS_CSV, Catalog, build_catalog_store, load_shared_clean, read_table
+
+SIZES = (10_000, 100_000, 1_000_000)
+BENCHMARK_DIR = os.path.join(".cache", "benchmarks")
+# A stage this much slower than the baseline is reported as a regression
+REGRESSION_RATIO = 1.2
+RSS_SAMPLE_SECONDS = 0.005
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+BRANDS = np.array(["Roadster", "HERE&NOW", "Bewakoof", "H&M", "Puma", "Levis", "Allen Solly", "ASOS DESIGN"])
+COLORS = np.array(["Navy Blue", "Black", "White", "Olive Green", "Maroon", "Grey Melange", "Beige"])
+SOURCES = np.array(["Myntra", "Flipkart", "Amazon.in", "AJIO", "Meesho", "Tata CLiQ"])
+MATERIALS = np.array(["Cotton", "Polyester", "Cotton Blend", "Linen", ""])
+NECK_TYPES = np.array(["Round Neck", "Polo Neck", "V Neck", ""])
+SLEEVE_TYPES = np.array(["Short Sleeve", "Long Sleeve", "Half-sleeve", ""])
+SIZE_TOKENS = np.array(["S", "M", "L", "XL", "2XL", "3XL"])
+FEATURE_NOTES = np.array([
+    "Solid T-shirt for men, Regular length, Short, regular sleeves, Knitted cotton fabric",
+    "Printed T-shirt for men, Regular length, Long, regular sleeves, Knitted polyester fabric",
+    "Oversized fit, Drop shoulder, Graphic print, Machine wash",
+    "",
+])
+
+
+def synthetic_raw_catalog(n, seed=0):
+    """A raw scrape of n products with the columns and text formats of product_data_with_details.csv."""
+    rng = np.random.default_rng(seed)
+    neck = rng.choice(NECK_TYPES, n, p=[0.6, 0.2, 0.1, 0.1])
+    color = rng.choice(COLORS, n)
+    details_parts = [
+        pd.Series(np.where(rng.random(n) < 0.3, "Graphic T-shirts · ", ""), dtype=object) + "Men's",
+        pd.Series(rng.choice(SIZE_TOKENS, n), dtype=object),
+        pd.Series(rng.choice(MATERIALS, n, p=[0.5, 0.2, 0.1, 0.05, 0.15]), dtype=object),
+        pd.Series(neck, dtype=object),
+        pd.Series(rng.choice(SLEEVE_TYPES, n, p=[0.55, 0.15, 0.1, 0.2]), dtype=object),
+        pd.Series("Regular", index=range(n), dtype=object),
+    ]
+    product_details = details_parts[0].str.cat(details_parts[1:], sep=" · ").str.replace(
+        r"(?: · )+", " · ", regex=True
+    )
+
+    prices = np.clip(rng.lognormal(6.5, 0.5, n), 150, 3000).round()
+    return pd.DataFrame({
+        "position": np.arange(n) % 100 + 1,
+        "title": pd.Series(rng.choice(BRANDS, n), dtype=object) + " Men " + color + " " + neck + " T-shirt",
+        "product_link": [
+            f"https://www.google.co.in/shopping/product/{i}?gl=in"
+            for i in rng.integers(10**17, 10**19, n, dtype=np.uint64)
+        ],
+        "source": rng.choice(SOURCES, n),
+        "price": [f"₹{p:,.2f}" for p in prices],
+        "rating": rng.uniform(3.0, 5.0, n).round(1),
+        "reviews": rng.geometric(0.01, n),
+        "product_details": product_details,
+        "additional_features": rng.choice(FEATURE_NOTES, n),
+        "detailed_reviews": synthetic_review_strings(n, rng),
+    })
+
+
+def synthetic_review_strings(n, rng):
+    """Up to ten "<stars>★ - <day> <Month> <year>" entries per product, "No reviews found" for none."""
+    counts = rng.integers(0, 11, n)
+    owners = np.repeat(np.arange(n), counts)
+    days = pd.to_datetime(rng.integers(
+        (pd.Timestamp("2019-01-01") - pd.Timestamp("1970-01-01")).days,
+        (pd.Timestamp("2024-10-15") - pd.Timestamp("1970-01-01")).days,
+        len(owners),
+    ), unit="D")
+    stars = rng.choice(np.array(["1", "2", "3", "4", "5"], dtype=object), len(owners), p=[0.08, 0.05, 0.1, 0.27, 0.5])
+    entries = pd.Series(
+        stars + "★ - " + days.day.astype(str).to_numpy(dtype=object) + " "
+        + days.month_name().to_numpy(dtype=object) + " " + days.year.astype(str).to_numpy(dtype=object)
+    )
+    joined = entries.groupby(owners).agg("; ".join)
+    return joined.reindex(np.arange(n), fill_value="No reviews found").to_numpy()
+
+
+class _StubCompletions:
+    @staticmethod
+    def create(**kwargs):
+        for word in ["Synthetic ", "benchmark ", "insight."]:
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=word))])
+
+
+StubLLMClient = types.SimpleNamespace(chat=types.SimpleNamespace(completions=_StubCompletions))
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class PeakRSS:
+    """Samples this process's resident set size on a thread while the with-block runs."""
+
+    def __enter__(self):
+        self.start = _rss_bytes()
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            rss = _rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        rss = _rss_bytes()
+        if rss is not None and self.peak is not None:
+            self.peak = max(self.peak, rss)
+
+
+def _measure(results, size, stage, fn):
+    with PeakRSS() as memory:
+        start = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - start
+    row = {"size": size, "stage": stage, "seconds": seconds}
+    if memory.peak is not None:
+        row["peak_rss_mb"] = memory.peak / 2**20
+        row["rss_growth_mb"] = (memory.peak - memory.start) / 2**20
+    results.append(row)
+    print(f"{size:>9,} {stage:<24} {seconds:9.3f}s {row.get('peak_rss_mb', float('nan')):9.1f} MB peak "
+          f"(+{row.get('rss_growth_mb', float('nan')):.1f} MB)", flush=True)
+    return value
+
+
+def run_size(n, seed=0):
+    """Generate a catalog of n products in a scratch directory and time every stage on it."""
+    import plotly.express as px
+
+    from aggregates import AggregateCube
+    from chart_data import histogram_bins, scatter_points, use_webgl
+    from etl import run_etl
+    from forecasting import feature_demand_by_date, generate_predictions, top_trending
+    from insights import calculate_similarity, make_user_product, product_insights
+    from llm import stream_chat_completion
+    from llm_cache import ResponseCache
+    from model_registry import load_model, train_model
+    from prompts import market_insights_messages
+    from reviews import ReviewStore
+    from similarity_index import SimilarityIndex
+
+    results = []
+    user_product = make_user_product(500, "Cotton", "Round Neck", "Short Sleeve")
+    workdir = tempfile.mkdtemp(prefix=f"bench-{n}-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        raw = _measure(results, n, "synthetic_catalog", lambda: synthetic_raw_catalog(n, seed))
+        raw.to_csv(DETAILS_CSV, index=False)
+        del raw
+        _measure(results, n, "etl", lambda: run_etl(DETAILS_CSV, CLEAN_CSV))
+        _measure(results, n, "load_csv", lambda: (pd.read_csv(CLEAN_CSV), pd.read_csv(DETAILS_CSV)))
+        _measure(results, n, "catalog_ingest", lambda: build_catalog_store(force=True))
+        clean_data = _measure(results, n, "load_data", load_shared_clean)
+        catalog = Catalog()
+
+        def dense_similarity():
+            similarities = calculate_similarity(user_product, clean_data)
+            return np.argsort(similarities)[-5:][::-1]
+
+        _measure(results, n, "calculate_similarity", dense_similarity)
+        index = _measure(results, n, "similarity_index_build", lambda: SimilarityIndex.build(clean_data))
+        rows, _ = _measure(results, n, "similarity_top_k", lambda: index.top_k(user_product, 5))
+        _measure(results, n, "similar_product_details", lambda: catalog.details(rows))
+
+        version, _ = _measure(results, n, "train_model", lambda: train_model(clean_data, registry_dir="models"))
+        model, _ = load_model(version, "models")
+        forecast = _measure(results, n, "generate_predictions", lambda: generate_predictions(model, clean_data))
+
+        def segment_analysis():
+            return product_insights(AggregateCube.build(clean_data), user_product)
+
+        _measure(results, n, "segment_analysis", segment_analysis)
+
+        def trends_figure():
+            feature_demand = feature_demand_by_date(clean_data, forecast)
+            top_trending(forecast, 5)
+            figure = px.line(feature_demand, x="date", y="predicted_reviews", color="material")
+            return len(figure.to_json())
+
+        _measure(results, n, "visualize_trends", trends_figure)
+
+        def market_overview_figures():
+            bins = histogram_bins(clean_data['price'])
+            points = scatter_points(clean_data, 'price', 'rating', size='reviews')
+            figures = [
+                px.bar(bins, x='center', y='count'),
+                px.scatter(points, x='price', y='rating', size='reviews',
+                           render_mode='webgl' if use_webgl(len(points)) else 'auto'),
+            ]
+            return sum(len(figure.to_json()) for figure in figures)
+
+        _measure(results, n, "market_overview_charts", market_overview_figures)
+
+        detailed_reviews = read_table("details", ["detailed_reviews"])["detailed_reviews"]
+        _measure(results, n, "review_parse", lambda: ReviewStore.build(detailed_reviews))
+
+        def market_insights():
+            messages = market_insights_messages(clean_data)
+            return "".join(stream_chat_completion(messages, ResponseCache("llm.sqlite3"), StubLLMClient))
+
+        _measure(results, n, "llm_market_insights", market_insights)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(sizes=SIZES, seed=0):
+    results = [row for n in sizes for row in run_size(n, seed)]
+    return {
+        "commit": _commit(),
+        "created_at": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(baseline_path, current_path, ratio=REGRESSION_RATIO):
+    """Print per-stage time ratios between two result files; return the regressed (size, stage) pairs."""
+    with open(baseline_path) as f:
+        baseline = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(current_path) as f:
+        current = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"{'size':>9} {'stage':<24} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key]["seconds"], current[key]["seconds"]
+        change = after / before if before > 0 else float("inf")
+        flag = " REGRESSION" if change > ratio else ""
+        if flag:
+            regressions.append(key)
+        print(f"{key[0]:>9,} {key[1]:<24} {before:9.3f}s {after:9.3f}s {change:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analytic stages on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), metavar="N")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result file (default: .cache/benchmarks/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO,
+                        help="slowdown treated as a regression in --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, ratio=args.ratio) else 0)
+
+    report = run_benchmarks(args.sizes, args.seed)
+    out = args.out or os.path.join(BENCHMARK_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
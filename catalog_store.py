@@ -0,0 +1,329 @@
+"""Typed columnar copy of the product catalog.
+
+The scraped CSVs are ingested once into Parquet files with compact dtypes and
+read back through memory mapping with column projection, so loading cost
+scales with the columns a caller actually needs instead of full CSV parsing.
+Run ``python catalog_store.py`` to (re)build the store ahead of time.
+
+Every product gets a stable ``product_id`` (a hash of its link, title, source
+and price text, plus an occurrence number for exact repeats) in both tables.
+``Catalog`` maps IDs to rows through a hash index and fetches the heavy text
+columns from disk, one row group at a time, only for the rows asked for.
+
+The clean table is also kept as one uncompressed ``.npy`` file per column.
+``load_shared_clean`` memory-maps those read-only, so every session and
+every server process on the machine reads the same pages of the OS cache
+instead of holding its own copy. ``iter_table_batches`` streams a table in
+fixed-size batches for jobs that must never hold all of it, such as
+out-of-core training.
+"""
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CLEAN_CSV = "Final_Cleaned_and_Structured_Dataset.csv"
+DETAILS_CSV = "product_data_with_details.csv"
+STORE_DIR = os.environ.get("CATALOG_STORE_DIR", os.path.join(".cache", "catalog"))
+CHUNK_ROWS = 100_000
+# Small row groups let Catalog.details read a handful of products without decoding whole columns
+DETAILS_ROW_GROUP_ROWS = 4096
+# Bump when the stored tables change layout so existing stores are rebuilt
+STORE_FORMAT = 3
+
+FEATURE_COLUMNS = ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+
+CLEAN_SCHEMA = pa.schema(
+    [
+        ('price', pa.float32()),
+        ('rating', pa.float32()),
+        ('reviews', pa.int32()),
+        ('review_growth_rate', pa.float32()),
+    ]
+    + [(feature, pa.uint8()) for feature in FEATURE_COLUMNS]
+    + [('product_index', pa.int32()), ('product_id', pa.uint64())]
+)
+
+DETAILS_SCHEMA = pa.schema([
+    ('position', pa.int32()),
+    ('title', pa.string()),
+    ('product_link', pa.string()),
+    ('source', pa.string()),
+    ('price', pa.string()),
+    ('rating', pa.float32()),
+    ('reviews', pa.int32()),
+    ('product_details', pa.string()),
+    ('additional_features', pa.string()),
+    ('detailed_reviews', pa.string()),
+    ('product_id', pa.uint64()),
+])
+# Raw columns that identify a product listing
+IDENTITY_COLUMNS = ['product_link', 'title', 'source', 'price']
+DETAIL_COLUMNS = ['title', 'product_link', 'source', 'product_details', 'additional_features']
+
+# Low-cardinality text read back as pandas categoricals
+CATEGORICAL_COLUMNS = ['source']
+
+# Details first: the clean table takes its product IDs from the details rows
+TABLES = {
+    "details": (DETAILS_CSV, DETAILS_SCHEMA),
+    "clean": (CLEAN_CSV, CLEAN_SCHEMA),
+}
+
+
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _table_path(name, store_dir):
+    return os.path.join(store_dir, f"{name}.parquet")
+
+
+def _columns_dir(store_dir):
+    return os.path.join(store_dir, "clean_columns")
+
+
+def _column_path(column, store_dir):
+    return os.path.join(_columns_dir(store_dir), f"{column}.npy")
+
+
+def temp_path(path, suffix=".tmp"):
+    """Unique temporary file beside path, to be written and then renamed over it.
+
+    Every artifact writer goes through this, so concurrent writers of the same
+    artifact never share a temporary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=suffix,
+    )
+    os.close(fd)
+    # mkstemp creates the file owner-only; the renamed artifact is read by other processes and users
+    os.chmod(tmp_path, 0o644)
+    return tmp_path
+
+
+@contextlib.contextmanager
+def _build_lock(store_dir):
+    # Blocking, so a process that finds a rebuild under way waits for it instead of repeating it
+    with open(os.path.join(store_dir, "build.lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_column_arrays(store_dir):
+    """Save each clean column as a .npy file so it can be memory-mapped without decoding."""
+    os.makedirs(_columns_dir(store_dir), exist_ok=True)
+    # One column at a time, so the conversion never holds the whole table
+    for column in CLEAN_SCHEMA.names:
+        values = pq.read_table(_table_path("clean", store_dir), columns=[column]).column(0)
+        # np.save appends .npy to any other name
+        tmp_path = temp_path(_column_path(column, store_dir), suffix=".tmp.npy")
+        np.save(tmp_path, values.to_numpy())
+        os.replace(tmp_path, _column_path(column, store_dir))
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, "manifest.json")
+
+
+def _read_manifest(store_dir):
+    try:
+        with open(_manifest_path(store_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _product_ids(chunk, seen):
+    """Stable IDs for a chunk of raw rows; seen counts earlier occurrences of each listing."""
+    identity = pd.util.hash_pandas_object(chunk[IDENTITY_COLUMNS].astype(str), index=False).to_numpy()
+    occurrence = np.empty(len(identity), dtype=np.uint64)
+    for i, key in enumerate(identity.tolist()):
+        occurrence[i] = seen.get(key, 0)
+        seen[key] = occurrence[i] + 1
+    keyed = pd.DataFrame({"identity": identity, "occurrence": occurrence})
+    return pd.util.hash_pandas_object(keyed, index=False).to_numpy()
+
+
+def _convert_csv(csv_path, schema, out_path, product_ids=None, chunk_rows=CHUNK_ROWS):
+    """Stream a CSV into a Parquet file chunk by chunk, casting to schema; return the product IDs.
+
+    With product_ids given (the clean table), row i gets product_ids[i] and a
+    product_index; otherwise IDs are derived from the raw identity columns.
+    """
+    tmp_path = temp_path(out_path)
+    offset = 0
+    seen = {}
+    ids = []
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            if product_ids is not None:
+                if offset + len(chunk) > len(product_ids):
+                    raise ValueError(f"{csv_path} has more rows than {DETAILS_CSV}")
+                # Add index column to clean_data to match with full_data
+                chunk['product_index'] = np.arange(offset, offset + len(chunk), dtype=np.int32)
+                chunk['product_id'] = product_ids[offset:offset + len(chunk)]
+            else:
+                chunk['product_id'] = _product_ids(chunk, seen)
+                ids.append(chunk['product_id'].to_numpy())
+            offset += len(chunk)
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False),
+                row_group_size=DETAILS_ROW_GROUP_ROWS,
+            )
+    if product_ids is not None and offset != len(product_ids):
+        raise ValueError(f"{csv_path} has {offset} rows but {DETAILS_CSV} has {len(product_ids)}")
+    os.replace(tmp_path, out_path)
+    return product_ids if product_ids is not None else np.concatenate(ids or [np.empty(0, np.uint64)])
+
+
+def _is_current(manifest, store_dir):
+    return manifest.get("format") == STORE_FORMAT and all(
+        manifest.get(name, {}).get("source") == _source_fingerprint(csv_path)
+        and os.path.exists(_table_path(name, store_dir))
+        for name, (csv_path, _) in TABLES.items()
+    )
+
+
+def build_catalog_store(store_dir=STORE_DIR, force=False):
+    """Convert the catalog CSVs to Parquet if either is missing or out of date; return the manifest.
+
+    The dashboard and the background retrain can both get here, so rebuilds
+    are serialized by a lock file in the store directory.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = _read_manifest(store_dir)
+    if _is_current(manifest, store_dir) and not force:
+        return manifest
+
+    with _build_lock(store_dir):
+        # Another process may have finished the same rebuild while this one waited
+        manifest = _read_manifest(store_dir)
+        if _is_current(manifest, store_dir) and not force:
+            return manifest
+
+        # Both tables are rebuilt together so their product IDs stay in step
+        manifest = {"format": STORE_FORMAT}
+        product_ids = None
+        for name, (csv_path, schema) in TABLES.items():
+            fingerprint = _source_fingerprint(csv_path)
+            product_ids = _convert_csv(csv_path, schema, _table_path(name, store_dir), product_ids)
+            manifest[name] = {"source": fingerprint, "rows": len(product_ids)}
+        _write_column_arrays(store_dir)
+        tmp_path = temp_path(_manifest_path(store_dir))
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, _manifest_path(store_dir))
+    return manifest
+
+
+def catalog_version(store_dir=STORE_DIR):
+    """Short hash identifying the current catalog contents, for keying derived artifacts."""
+    manifest = build_catalog_store(store_dir)
+    sources = {name: manifest[name]["source"] for name in sorted(TABLES)}
+    return hashlib.sha256(json.dumps(sources, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def read_table(name, columns=None, store_dir=STORE_DIR):
+    """Read one catalog table from the store, memory-mapped and limited to columns."""
+    table = pq.read_table(
+        _table_path(name, store_dir),
+        columns=columns,
+        memory_map=True,
+        read_dictionary=[col for col in CATEGORICAL_COLUMNS if columns is None or col in columns],
+    )
+    return table.to_pandas()
+
+
+def iter_table_batches(name, columns=None, batch_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    """Yield (first row position, DataFrame) for consecutive batches of at most batch_rows rows of a table."""
+    build_catalog_store(store_dir)
+    start = 0
+    parquet = pq.ParquetFile(_table_path(name, store_dir), memory_map=True)
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+        yield start, batch.to_pandas()
+        start += batch.num_rows
+
+
+def load_catalog(clean_columns=None, details_columns=None, store_dir=STORE_DIR):
+    """Return (clean_data, full_data) from the columnar store, building it first if needed."""
+    build_catalog_store(store_dir)
+    clean_data = read_table("clean", clean_columns, store_dir)
+    full_data = read_table("details", details_columns, store_dir)
+    return clean_data, full_data
+
+
+def load_shared_clean(store_dir=STORE_DIR):
+    """Clean table as a DataFrame over read-only memory-mapped column arrays.
+
+    Nothing is copied into the process: the frame's columns are views of the
+    mapped files. Writing to them raises, so callers that need a derived
+    column should work on ``frame.copy(deep=False)``, which copy-on-write
+    pandas gives its own storage only for the columns it changes.
+    """
+    build_catalog_store(store_dir)
+    columns = [field.name for field in CLEAN_SCHEMA]
+    return pd.DataFrame(
+        {column: np.load(_column_path(column, store_dir), mmap_mode="r") for column in columns},
+        copy=False,
+    )
+
+
+class Catalog:
+    """Product IDs with an O(1) ID -> row index, and on-demand access to the heavy text columns."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        build_catalog_store(store_dir)
+        self.store_dir = store_dir
+        self.product_ids = read_table("clean", ["product_id"], store_dir)["product_id"].to_numpy()
+        # pandas' hash-table index gives constant-time ID lookups
+        self._rows_by_id = pd.Index(self.product_ids)
+        metadata = pq.ParquetFile(_table_path("details", store_dir)).metadata
+        group_rows = [metadata.row_group(g).num_rows for g in range(metadata.num_row_groups)]
+        self._group_starts = np.concatenate([[0], np.cumsum(group_rows)]).astype(np.int64)
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def rows_of(self, product_ids):
+        """Row numbers of the given product IDs; raises KeyError for unknown IDs."""
+        rows = self._rows_by_id.get_indexer(np.asarray(product_ids, dtype=np.uint64))
+        if (rows < 0).any():
+            raise KeyError(f"unknown product ids: {np.asarray(product_ids)[rows < 0].tolist()}")
+        return rows
+
+    def details(self, rows, columns=DETAIL_COLUMNS):
+        """Text columns for the given rows, read from only the row groups that hold them."""
+        rows = np.asarray(rows, dtype=np.int64)
+        groups = np.searchsorted(self._group_starts, rows, side="right") - 1
+        needed = np.unique(groups)
+        if len(needed) == 0:
+            return pd.DataFrame(columns=list(columns), index=rows)
+        table = pq.ParquetFile(_table_path("details", self.store_dir), memory_map=True).read_row_groups(
+            needed.tolist(), columns=list(columns)
+        )
+        # Position of each requested row inside the concatenated row groups
+        group_offsets = np.cumsum(self._group_starts[needed + 1] - self._group_starts[needed])
+        group_offsets = np.concatenate([[0], group_offsets[:-1]])
+        local = group_offsets[np.searchsorted(needed, groups)] + rows - self._group_starts[groups]
+        frame = table.take(pa.array(local)).to_pandas()
+        frame.index = rows
+        return frame
+
+
+if __name__ == "__main__":
+    for table_name, entry in build_catalog_store(force=True).items():
+        if table_name == "format":
+            continue
+        print(f"{table_name}: {entry['rows']} rows -> {_table_path(table_name, STORE_DIR)}")
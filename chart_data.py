@@ -0,0 +1,102 @@
+"""Bounded-size chart data for catalog-scale plots.
+
+Plotly figures embed every row they are given, so a chart over the raw
+catalog grows with the catalog. These helpers reduce the data on the server
+first, keeping each figure's payload bounded by a constant:
+
+* ``histogram_bins``: counts per bin, drawn as bars instead of a histogram
+  over the raw values
+* ``scatter_points``: the raw points up to ``MAX_SCATTER_POINTS``; beyond
+  that, one point per occupied cell of a fixed grid, placed at the cell's
+  mean, with summed sizes and a product count
+* ``downsample_series``: per-series min/max bucketing of long line series,
+  which keeps peaks and troughs
+* ``use_webgl``: whether a trace has enough points to be drawn with WebGL
+"""
+import numpy as np
+import pandas as pd
+
+HISTOGRAM_BINS = 30
+# Above this many points scatter traces switch from SVG to WebGL
+WEBGL_MIN_POINTS = 1_000
+MAX_SCATTER_POINTS = 20_000
+SCATTER_GRID = (120, 40)
+MAX_LINE_POINTS = 500
+
+
+def use_webgl(n_points):
+    return n_points > WEBGL_MIN_POINTS
+
+
+def histogram_bins(values, nbins=HISTOGRAM_BINS):
+    """Frame of bin left/right edges, center, width and count for equal-width bins over values."""
+    values = pd.Series(values).dropna().to_numpy(dtype=np.float64)
+    if len(values) == 0:
+        return pd.DataFrame(columns=["left", "right", "center", "width", "count"])
+    counts, edges = np.histogram(values, bins=nbins)
+    return pd.DataFrame({
+        "left": edges[:-1],
+        "right": edges[1:],
+        "center": (edges[:-1] + edges[1:]) / 2,
+        "width": np.diff(edges),
+        "count": counts,
+    })
+
+
+def scatter_points(frame, x, y, size=None, max_points=MAX_SCATTER_POINTS, grid=SCATTER_GRID):
+    """Points to plot for x vs y, with a 'products' column counting the rows behind each point.
+
+    Returns the rows themselves (products = 1) when there are at most
+    max_points of them; otherwise one point per occupied grid cell, at the
+    mean x and y of its rows, with size summed.
+    """
+    columns = [x, y] + ([size] if size else [])
+    points = frame[columns].dropna(subset=[x, y])
+    if len(points) <= max_points:
+        return points.assign(products=1).reset_index(drop=True)
+
+    x_values = points[x].to_numpy(dtype=np.float64)
+    y_values = points[y].to_numpy(dtype=np.float64)
+    x_bins = _bin_index(x_values, grid[0])
+    y_bins = _bin_index(y_values, grid[1])
+    cells, cell = np.unique(x_bins * grid[1] + y_bins, return_inverse=True)
+    counts = np.bincount(cell, minlength=len(cells))
+    binned = {
+        x: np.bincount(cell, weights=x_values, minlength=len(cells)) / counts,
+        y: np.bincount(cell, weights=y_values, minlength=len(cells)) / counts,
+    }
+    if size:
+        binned[size] = np.bincount(cell, weights=np.nan_to_num(points[size].to_numpy(dtype=np.float64)),
+                                   minlength=len(cells))
+    binned["products"] = counts
+    return pd.DataFrame(binned)
+
+
+def _bin_index(values, nbins):
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.zeros(len(values), dtype=np.int64)
+    return np.minimum(((values - low) / (high - low) * nbins).astype(np.int64), nbins - 1)
+
+
+def downsample_series(frame, x, y, by=(), max_points=MAX_LINE_POINTS):
+    """Rows of frame with each series (one per by-group) cut to about max_points by min/max bucketing."""
+    by = list(by)
+    groups = frame.groupby(by, sort=False, observed=True) if by else [(None, frame)]
+    kept = []
+    for _, series in groups:
+        series = series.sort_values(x, kind="stable")
+        if len(series) <= max_points:
+            kept.append(series)
+            continue
+        # Keep the lowest and highest point of each bucket, plus both ends
+        buckets = np.arange(len(series)) * (max_points // 2) // len(series)
+        values = series[y].to_numpy()
+        order = np.lexsort((values, buckets))
+        starts = np.flatnonzero(np.r_[True, buckets[order][1:] != buckets[order][:-1]])
+        ends = np.r_[starts[1:], len(order)] - 1
+        positions = np.unique(np.concatenate([order[starts], order[ends], [0, len(series) - 1]]))
+        kept.append(series.iloc[positions])
+    if not kept:
+        return frame.iloc[:0]
+    return pd.concat(kept)
@@ -1,117 +1,205 @@
+import datetime
+import time
+
+# Streamlit re-executes this script on every rerun; only the first run in a
+# process pays for the imports below, and the trace records how long they took
+_imports_start = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-from groq import Groq
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
-import json
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
-from xgboost import XGBRegressor
-import joblib
-import os
-import pandas as pd
-import plotly.express as px
-import datetime
+import contextvars
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import ResponseCache
+from llm import LazyGroqClient, stream_chat_completion
+from prompts import competitive_analysis_messages, market_insights_messages
+from catalog_store import Catalog, catalog_version, load_shared_clean
+from similarity_index import load_or_build_index
+from reviews import load_or_build_reviews
+from forecasting import (
+    TRAINING_COLUMNS, feature_combination_codes, feature_demand_by_date, generate_predictions, top_trending
+)
+from model_registry import TARGET_COLUMN, current_version, load_or_train, test_positions
+from retrain import start_background_retrain
+from demand_surface import (
+    load_or_build_surface, lookup_demand, lookup_product_demand, model_version, on_grid, price_sweep,
+)
+from fast_inference import compile_model, feature_vector, product_vector
+from aggregates import load_or_build_cube
+from chart_data import downsample_series, histogram_bins, scatter_points, use_webgl
+from insights import make_user_product, product_insights, similar_products
+from tracing import annotate, span, trace, traced
+
+# plotly, xgboost, scikit-learn and groq are imported by the views and helpers that use them
+IMPORTS_MS = (time.perf_counter() - _imports_start) * 1000
 
 # Configure page settings
 st.set_page_config(page_title="Product Analysis Dashboard", layout="wide")
 
-# Initialize Groq client
-groq_client = Groq(
-    api_key=st.secrets["GROQ_API_KEY"]
-)
+@st.cache_resource
+def get_groq_client():
+    """Groq client shared by all sessions, created on the first LLM call that misses the cache."""
+    return LazyGroqClient(lambda: st.secrets["GROQ_API_KEY"])
+
+
+@st.cache_resource
+def get_llm_cache():
+    """Shared on-disk cache of LLM responses (survives reruns, sessions and restarts)."""
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_llm_executor():
+    """Worker pool that runs LLM calls while the rest of the page renders."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm")
+
+
+class LLMStream:
+    """Consumes a text stream on a worker thread and buffers it for the script thread."""
+
+    def __init__(self, executor, chunks):
+        self.text = ""
+        self.done = False
+        self._queue = queue.Queue()
+        # Run in a copy of this context so the LLM spans join the rerun's trace
+        executor.submit(contextvars.copy_context().run, self._consume, chunks)
+
+    def _consume(self, chunks):
+        try:
+            for chunk in chunks:
+                self._queue.put(chunk)
+            self._queue.put(None)
+        except Exception as exc:  # surfaced in the script thread by poll()
+            self._queue.put(exc)
+
+    def poll(self):
+        """Pull everything that has arrived so far; return True if the text changed."""
+        changed = False
+        while not self.done:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.done = True
+            elif isinstance(item, Exception):
+                self.done = True
+                raise item
+            else:
+                self.text += item
+                changed = True
+        return changed
+
+
+def render_llm_streams(streams, poll_interval=0.05):
+    """Write each stream into its placeholder as tokens arrive until all are finished."""
+    pending = list(streams)
+    while pending:
+        for stream, placeholder in list(pending):
+            if stream.poll():
+                placeholder.markdown(stream.text + ("" if stream.done else " ▌"))
+            if stream.done:
+                placeholder.markdown(stream.text)
+                pending.remove((stream, placeholder))
+        if pending:
+            time.sleep(poll_interval)
+
+def plotly_chart(fig):
+    """st.plotly_chart inside a span, so figure serialization shows up in the trace."""
+    with span("plotly_chart", title=fig.layout.title.text):
+        st.plotly_chart(fig)
+
+
+def render_trace_panel(current):
+    """Sidebar table of the spans this rerun has finished so far."""
+    if current is None or not st.sidebar.toggle("Show timing breakdown", key="show_trace"):
+        return
+    spans = pd.DataFrame(current.to_dict()["spans"])
+    columns = ["name", "duration_ms", "cache", "prompt_tokens", "completion_tokens"]
+    st.sidebar.caption(f"Rerun so far: {current.elapsed_ms():.0f} ms")
+    st.sidebar.dataframe(spans.reindex(columns=columns), hide_index=True)
 
 # Load and prepare data
-@st.cache_data
+@st.cache_resource
+def get_shared_clean_data(version):
+    """One memory-mapped, read-only clean table per catalog version, shared by every session."""
+    annotate(cache="miss")
+    return load_shared_clean()
+
+
 def load_data():
-    clean_data = pd.read_csv("Final_Cleaned_and_Structured_Dataset.csv")
-    full_data = pd.read_csv("product_data_with_details.csv")
-    # Add index column to clean_data to match with full_data
-    clean_data['product_index'] = range(len(clean_data))
-    return clean_data, full_data
+    # Each caller gets a shallow copy-on-write view of the shared frame, so a
+    # derived column added by one view never leaks into another session. The
+    # text columns stay on disk and are fetched through get_catalog(version)
+    return get_shared_clean_data(catalog_version()).copy(deep=False)
+
+
+@st.cache_resource
+def get_catalog(version):
+    """Product ID index plus lazy access to the scraped text columns, per catalog version."""
+    with span("get_catalog", cache="miss"):
+        return Catalog()
 
 
 @st.cache_resource
+def load_registered_model(version, data_version, _data):
+    """Registered model plus its manifest (version, fingerprints, cached metrics)."""
+    # Cached per registry and catalog version, so a model swapped in by retrain.py is picked up on the
+    # next rerun, and rows added to the catalog are checked for staleness (and retrained) right away
+    annotate(cache="miss")
+    model, manifest = load_or_train(_data, retrain_stale=False)
+    if manifest.get("stale"):
+        # New or changed rows: keep serving this version and refresh it off the request path
+        start_background_retrain()
+    return model, manifest
+
+
+def load_model_and_manifest(data):
+    """Model and manifest for the version CURRENT points at."""
+    return load_registered_model(current_version(), catalog_version(), data)
+
+
 def train_or_load_model(data):
     """Train or load the XGBoost model for demand prediction."""
-    # Features for training
-    training_columns = ['price', 'review_growth_rate', 'Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
-    target_column = 'reviews'  # Target variable
-
-    # Define input features and target variable
-    X = data[training_columns]
-    y = data[target_column]
-
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # Check for an existing model
-    model_path = "xgboost_demand_model.joblib"
-    if os.path.exists(model_path):
-        # Load the existing model
-        model = joblib.load(model_path)
-    else:
-        # Train the model
-        model = XGBRegressor(n_estimators=100, learning_rate=0.1, max_depth=5, random_state=42)
-        model.fit(X_train, y_train)
+    with span("train_or_load_model", cache="hit") as record:
+        model, manifest = load_model_and_manifest(data)
+        record["model_version"] = manifest["version"]
 
-        # Save the trained model for future use
-        joblib.dump(model, model_path)
+    # Held-out rows recorded at training time (no re-split needed)
+    test_idx = test_positions(manifest, data)
+    X_test = data[TRAINING_COLUMNS].iloc[test_idx]
+    y_test = data[TARGET_COLUMN].iloc[test_idx]
 
     return model, X_test, y_test
 
-def generate_predictions(model, clean_data, days_ahead=30):
-    """Generate predictions for the clean_data with future dates."""
-    # Generate a DataFrame for future prediction
-    future_data = generate_future_data(clean_data, days_ahead)
-    
-    # Make predictions
-    future_data["predicted_reviews"] = model.predict(
-        future_data[["price", "review_growth_rate", "Cotton", "Polyester", "Round Neck", "Polo Neck", "Short Sleeve", "Long Sleeve"]]
-    )
-    
-    # Add product_id for grouping trends
-    if "product_index" in clean_data.columns:
-        # Repeat product_index to match the future_data length
-        num_products = len(clean_data)
-        repeat_factor = len(future_data) // num_products  # How many times to repeat each product
-        remainder = len(future_data) % num_products      # Handle cases where it's not an exact multiple
-
-        # Repeat product indices and handle remainder
-        product_ids = list(clean_data["product_index"]) * repeat_factor + list(clean_data["product_index"][:remainder])
-        future_data["product_id"] = product_ids
-    
-    return future_data
 
+@st.cache_resource
+def get_compiled_model(version, _model):
+    """Flattened trees of one model version, verified against model.predict when compiled."""
+    with span("compile_model", cache="miss"):
+        return compile_model(_model)
 
-def generate_future_data(clean_data, days_ahead=30):
-    """Generate future data for prediction."""
-    future_dates = [datetime.date.today() + datetime.timedelta(days=i) for i in range(days_ahead)]
-    future_data = []
 
-    # Use sample products from clean_data for prediction
-    for _, product in clean_data.sample(n=10, random_state=42).iterrows():  # Adjust n as needed
-        for date in future_dates:
-            future_data.append({
-                'date': date,
-                'price': product['price'],  # Use existing product price
-                'review_growth_rate': product['review_growth_rate'],  # Use existing growth rate
-                'Cotton': product['Cotton'],
-                'Polyester': product['Polyester'],
-                'Round Neck': product['Round Neck'],
-                'Polo Neck': product['Polo Neck'],
-                'Short Sleeve': product['Short Sleeve'],
-                'Long Sleeve': product['Long Sleeve']
-            })
+def compiled_model_for(model):
+    """Compiled trees matching the given trained model."""
+    return get_compiled_model(model_version(model), model)
 
-    return pd.DataFrame(future_data)
 
+@st.cache_resource
+def get_demand_surface(version, _model):
+    """Demand surface for one model version, persisted next to the model artifacts."""
+    with span("get_demand_surface", cache="miss"):
+        return load_or_build_surface(_model, version)
 
 
-def visualize_trends(clean_data, predictions_df):
+def demand_surface_for(model):
+    """Demand surface matching the given trained model."""
+    return get_demand_surface(model_version(model), model)
+
+
+def visualize_trends(clean_data, forecast):
+    import plotly.express as px
+
     st.header("Consumer Behavior Trends")
 
     # Add tabs for Emerging Trends and Top Trending Products
@@ -121,18 +209,12 @@ def visualize_trends(clean_data, predictions_df):
     with tab1:
         st.subheader("Emerging Trends & Recommendations")
         
-        # Analyze trends for features like materials, neck types, etc.
-        feature_trends = predictions_df.copy()
-        feature_trends["material"] = feature_trends["Cotton"].apply(lambda x: "Cotton" if x == 1 else "Polyester")
-        feature_trends["neck_type"] = feature_trends["Round Neck"].apply(lambda x: "Round Neck" if x == 1 else "Polo Neck")
-        feature_trends["sleeve_type"] = feature_trends["Short Sleeve"].apply(lambda x: "Short Sleeve" if x == 1 else "Long Sleeve")
-        
-        # Aggregate feature trends over time
-        feature_demand = feature_trends.groupby(["date", "material", "neck_type", "sleeve_type"])["predicted_reviews"].sum().reset_index()
+        # Aggregate feature trends (materials, neck types, etc.) over time
+        feature_demand = feature_demand_by_date(clean_data, forecast)
         
         # Visualize feature trends over time
         fig_features = px.line(
-            feature_demand,
+            downsample_series(feature_demand, "date", "predicted_reviews", by=["material", "neck_type", "sleeve_type"]),
             x="date",
             y="predicted_reviews",
             color="material",
@@ -141,7 +223,7 @@ def visualize_trends(clean_data, predictions_df):
             title="Emerging Feature Trends Over Time",
             labels={"predicted_reviews": "Predicted Reviews"}
         )
-        st.plotly_chart(fig_features)
+        plotly_chart(fig_features)
 
         # Insights & Recommendations
         st.subheader("Actionable Recommendations")
@@ -167,16 +249,13 @@ def visualize_trends(clean_data, predictions_df):
     with tab2:
         st.subheader("Top Trending Products")
         
-        # Identify the top trending products
-        top_trending_products = (
-            predictions_df.groupby("product_id")["predicted_reviews"].sum()
-            .sort_values(ascending=False)
-            .head(5)  # Top 5 products
-        )
+        # Identify the top 5 trending products across the whole catalog
+        top_positions = top_trending(forecast, n=5)
         
-        # Extract product details
-        trending_products_details = clean_data[clean_data['product_index'].isin(top_trending_products.index)]
-        trending_products_details['total_predicted_reviews'] = top_trending_products.values
+        # Extract product details (in trending order, aligned with their totals)
+        trending_products_details = clean_data.iloc[top_positions].assign(
+            total_predicted_reviews=forecast["total_predicted_reviews"][top_positions]
+        )
 
         # Display as a table without Product ID
         st.write("### Top 5 Trending Products")
@@ -197,7 +276,17 @@ def visualize_trends(clean_data, predictions_df):
         st.write(f"**Current Reviews:** {int(top_product['reviews']):,}")
         st.write(f"**Predicted Reviews:** {int(top_product['total_predicted_reviews']):,}")
 
+@st.cache_resource
+def get_aggregate_cube(version):
+    """Segment x feature count/sum cube, built (or extended on append) once per catalog version."""
+    with span("get_aggregate_cube", cache="miss"):
+        clean_data = get_shared_clean_data(version).copy(deep=False)
+        return load_or_build_cube(clean_data, version)
+
+
 def feature_importance_analysis(model, data):
+    import plotly.express as px
+
     st.header("Feature Importance Analysis")
 
     # Extract feature importance from the model
@@ -223,18 +312,19 @@ def feature_importance_analysis(model, data):
         title="Feature Importance: Impact on Demand Prediction",
         labels={"Importance": "Impact on Demand Prediction", "Feature": "Feature"}
     )
-    st.plotly_chart(fig_importance)
+    plotly_chart(fig_importance)
 
     st.subheader("Behavioral Insights")
     st.write("**How different product features perform based on average reviews:**")
     
     # Features for behavioral insights
     features = ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+    feature_reviews = get_aggregate_cube(catalog_version()).feature_means('reviews')
     
     for feature in features:
         # Avoid calculating metrics for missing data
         if feature in data.columns:
-            avg_reviews = data[data[feature] == 1]['reviews'].mean()
+            avg_reviews = feature_reviews[feature]
             if not pd.isna(avg_reviews):
                 st.metric(feature, f"Average Reviews: {avg_reviews:.2f}")
             else:
@@ -261,20 +351,15 @@ def forecast_future_demand(model, data):
     neck_type = st.selectbox("Select Neck Type", ["Round Neck", "Polo Neck"], key="strategy_neck")
     sleeve_type = st.selectbox("Select Sleeve Type", ["Short Sleeve", "Long Sleeve"], key="strategy_sleeve")
 
-    # Create DataFrame for the user's input
-    user_product = pd.DataFrame({
-        'price': [price],
-        'review_growth_rate': [review_growth_rate],
-        'Cotton': [1 if material == "Cotton" else 0],
-        'Polyester': [1 if material == "Polyester" else 0],
-        'Round Neck': [1 if neck_type == "Round Neck" else 0],
-        'Polo Neck': [1 if neck_type == "Polo Neck" else 0],
-        'Short Sleeve': [1 if sleeve_type == "Short Sleeve" else 0],
-        'Long Sleeve': [1 if sleeve_type == "Long Sleeve" else 0]
-    })
-
-    # Step 2: Predict Demand
-    predicted_demand = model.predict(user_product)[0]
+    # Step 2: Predict Demand (surface lookup on grid inputs, compiled trees between grid points)
+    if on_grid(price, review_growth_rate):
+        predicted_demand = lookup_demand(
+            demand_surface_for(model), price, review_growth_rate, material, neck_type, sleeve_type
+        )
+    else:
+        predicted_demand = compiled_model_for(model).predict_one(
+            feature_vector(price, review_growth_rate, material, neck_type, sleeve_type)
+        )
     st.metric("Predicted Demand (Reviews)", f"{int(predicted_demand):,}")
 
     # Step 3: Analyze Data for Recommendations
@@ -282,17 +367,9 @@ def forecast_future_demand(model, data):
 
     # Price Optimization
     st.markdown("### Price Optimization")
-    # data['price_segment'] = pd.cut(data['price'], bins=5, labels=["Budget", "Economy", "Mid-Range", "Premium", "Luxury"])
-    price_segments = pd.cut(
-        data['price'],
-        bins=5,
-        labels=["Budget", "Economy", "Mid-Range", "Premium", "Luxury"]
-    )
-    # Convert categories to strings for proper display
-    data['price_segment'] = price_segments.astype(str)
-
-    segment_performance = data.groupby('price_segment').agg({'price': 'mean', 'reviews': 'mean', 'rating': 'mean'}).round(2)
-    user_segment = pd.cut([price], bins=5, labels=["Budget", "Economy", "Mid-Range", "Premium", "Luxury"])[0]
+    cube = get_aggregate_cube(catalog_version())
+    segment_performance = cube.segment_performance(['price', 'reviews', 'rating'])
+    user_segment = cube.segment_of(price)
 
     st.write(f"Your product falls under the **{user_segment}** segment.")
     st.dataframe(segment_performance)
@@ -301,10 +378,12 @@ def forecast_future_demand(model, data):
     st.markdown("### Feature Prioritization")
     feature_performance = []
     features = ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+    feature_counts = cube.feature_counts()
+    feature_reviews = cube.feature_means('reviews')
     for feature in features:
-        if data[feature].sum() > 0:  # Avoid division by zero
-            feature_demand = data[data[feature] == 1]['reviews'].mean()
-            feature_popularity = (data[feature].sum() / len(data)) * 100
+        if feature_counts[feature] > 0:  # Avoid division by zero
+            feature_demand = feature_reviews[feature]
+            feature_popularity = (feature_counts[feature] / cube.n_rows) * 100
         else:
             feature_demand = "Insufficient Data"
             feature_popularity = "Insufficient Data"
@@ -320,7 +399,7 @@ def forecast_future_demand(model, data):
 
     # Suggested Adjustments
     st.markdown("### Suggested Adjustments")
-    if predicted_demand < data['reviews'].mean():
+    if predicted_demand < cube.overall_mean('reviews'):
         st.write("1. **Price Optimization**: Consider adjusting the price to align with high-demand products.")
         st.write("2. **Feature Adjustment**: Consider adding high-demand features such as:")
         for _, row in feature_df.iterrows():
@@ -332,40 +411,29 @@ def forecast_future_demand(model, data):
 
 
 
-def convert_numpy_types(obj):
-    """Recursively convert numpy types to Python native types"""
-    if isinstance(obj, dict):
-        return {k: convert_numpy_types(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    return obj
-
-
 def display_demand_prediction_tab(clean_data, user_product):
+    import plotly.express as px
+
     st.header("Demand Prediction")
 
     # Train or load the model
     model, X_test, y_test = train_or_load_model(clean_data)
 
     # Predict demand for the user product
-    prediction = model.predict(user_product)[0]
+    row = user_product.iloc[0]
+    if on_grid(row['price'], row['review_growth_rate']):
+        prediction = lookup_product_demand(demand_surface_for(model), user_product)
+    else:
+        prediction = compiled_model_for(model).predict_one(product_vector(user_product))
     st.subheader("Predicted Demand")
     st.metric("Estimated Reviews (Demand Proxy)", f"{int(prediction):,}")
 
-    # Display model performance metrics
-    y_pred = model.predict(X_test)
-    mse = mean_squared_error(y_test, y_pred)
-    r2 = r2_score(y_test, y_pred)
+    # Display model performance metrics (scored once when the model version was registered)
+    metrics = load_model_and_manifest(clean_data)[1]["metrics"]
 
     st.subheader("Model Performance")
-    st.metric("Mean Squared Error", f"{mse:.2f}")
-    st.metric("R-squared", f"{r2:.2f}")
+    st.metric("Mean Squared Error", f"{metrics['mse']:.2f}")
+    st.metric("R-squared", f"{metrics['r2']:.2f}")
 
     # Display feature importance
     st.subheader("Feature Importance")
@@ -376,120 +444,443 @@ def display_demand_prediction_tab(clean_data, user_product):
 
     fig_importance = px.bar(feature_importances, x="Importance", y="Feature", orientation='h',
                             title="Feature Importance for Demand Prediction")
-    st.plotly_chart(fig_importance)
-
-def get_market_insights(data):
-    """Generate market insights using Groq LLM"""
-    market_summary = {
-        "avg_price": data['price'].mean(),
-        "avg_rating": data['rating'].mean(),
-        "price_range": {
-            "min": data['price'].min(),
-            "max": data['price'].max(),
-            "median": data['price'].median()
-        },
-        "popular_features": {
-            "Cotton": data['Cotton'].sum(),
-            "Polyester": data['Polyester'].sum(),
-            "Round_Neck": data['Round Neck'].sum(),
-            "Polo_Neck": data['Polo Neck'].sum(),
-            "Short_Sleeve": data['Short Sleeve'].sum(),
-            "Long_Sleeve": data['Long Sleeve'].sum()
-        },
-        "review_stats": {
-            "avg_reviews": data['reviews'].mean(),
-            "max_reviews": data['reviews'].max(),
-            "avg_growth": data['review_growth_rate'].mean()
-        }
-    }
-    
-    # Convert all numpy types to Python native types
-    market_summary = convert_numpy_types(market_summary)
-    
-    prompt = f"""
-    As a market analysis expert, provide detailed insights about the apparel market based on the following data:
-    {json.dumps(market_summary, indent=2)}
-    
-    Please analyze:
-    1. Overall market positioning and pricing strategy
-    2. Consumer preferences based on features
-    3. Market engagement trends based on reviews
-    4. Key recommendations for new entrants
-    
-    Format your response in clear sections with bullet points where appropriate.
-    Be specific and provide actionable insights based on the numbers .And use ₹ (INR)
-    """
-    response = groq_client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a market analysis expert specializing in e-commerce and apparel."},
-            {"role": "user", "content": prompt}
-        ],
-        model="mixtral-8x7b-32768",
-        temperature=0.5,
+    plotly_chart(fig_importance)
+
+def get_market_insights(data, cache):
+    """Generate market insights using Groq LLM, yielding the text as it streams in"""
+    with span("get_market_insights"):
+        messages = market_insights_messages(data)
+    return stream_chat_completion(messages, cache, get_groq_client())
+
+def get_competitive_analysis(similar_products_data, user_product, cache):
+    """Generate competitive analysis using Groq LLM, yielding the text as it streams in"""
+    with span("get_competitive_analysis"):
+        messages = competitive_analysis_messages(similar_products_data, user_product)
+    return stream_chat_completion(messages, cache, get_groq_client())
+
+
+@st.cache_resource
+def get_similarity_index(version):
+    """Similarity index (fitted scaling + partitioned vectors), built once per catalog version."""
+    with span("get_similarity_index", cache="miss"):
+        clean_data = get_shared_clean_data(version).copy(deep=False)
+        return load_or_build_index(clean_data, version)
+
+
+@st.cache_resource
+def get_review_store(version):
+    """Parsed review events and their windowed statistics, built (or updated) once per catalog version."""
+    with span("get_review_store", cache="miss"):
+        return load_or_build_reviews(version)
+
+
+@st.cache_data
+def find_similar_products(version, user_product, top_n=5):
+    """Return detailed information for the catalog products most similar to user_product."""
+    annotate(cache="miss")
+    clean_data = get_shared_clean_data(version).copy(deep=False)
+    return similar_products(
+        clean_data, get_catalog(version), get_similarity_index(version), user_product, top_n,
+        get_review_store(version).stats,
     )
-    return response.choices[0].message.content
 
-def get_competitive_analysis(similar_products_data, user_product):
-    """Generate competitive analysis using Groq LLM"""
-    prompt = f"""
-    As a product strategy expert, analyze these competing products against the user's product:
-    
-    User Product:
-    {json.dumps(user_product, indent=2)}
-    
-    Competing Products:
-    {json.dumps(similar_products_data, indent=2)}
-    
-    Provide a detailed competitive analysis including:
-    1. Price Positioning Analysis
-    - How does the user's product price compare to competitors?
-    - What's the optimal price point based on the market?
-    
-    2. Product Feature Analysis
-    - What features are common among successful competitors?
-    - What unique features could differentiate the user's product?
-    
-    3. Market Performance Indicators
-    - Analysis of ratings and reviews compared to competitors
-    - Identify what drives higher ratings in this category
-    
-    4. Specific Recommendations
-    - Clear, actionable steps to improve competitiveness
-    - Potential areas for differentiation
-    
-    Format your response in clear sections. Be specific and data-driven in your analysis.And use ₹ (INR), and make it so it looks like you are talking to the client.
-    """
-    
-    response = groq_client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a product strategy expert specializing in competitive analysis."},
-            {"role": "user", "content": prompt}
-        ],
-        model="mixtral-8x7b-32768",
-        temperature=0.5,
+
+@st.cache_data
+def analyze_product_insights(version, user_product):
+    """Price range, feature and segment analysis behind the Product Insights view."""
+    annotate(cache="miss")
+    return product_insights(get_aggregate_cube(version), user_product)
+
+
+@st.cache_data
+def get_price_sweep(version, review_growth_rate, _model):
+    """Demand and revenue curves of all eight feature combinations at one growth rate, per model version."""
+    annotate(cache="miss")
+    return price_sweep(_model, review_growth_rate)
+
+
+@st.cache_data
+def get_trend_predictions(version, data_version, start_date, _model, _data, days_ahead=30):
+    """Forecast used by the Demand & Trend Forecasting view, per model, catalog version and start date."""
+    annotate(cache="miss")
+    return generate_predictions(_model, _data, days_ahead=days_ahead, start_date=start_date)
+
+
+@st.fragment
+@traced("market_overview_view")
+def market_overview_view(clean_data):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    st.header("Market Overview")
+    # Start the LLM call now so it runs while the charts render
+    market_stream = LLMStream(get_llm_executor(), get_market_insights(clean_data, get_llm_cache()))
+
+    # Market Statistics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Average Price", f"₹{clean_data['price'].mean():.2f}")
+    with col2:
+        st.metric("Average Rating", f"{clean_data['rating'].mean():.1f}⭐")
+    with col3:
+        st.metric("Total Products", len(clean_data))
+    with col4:
+        st.metric("Avg Review Growth", f"{clean_data['review_growth_rate'].mean():.2%}")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Price Distribution with Market Segments
+        # Binned on the server: the figure carries 30 bars, not every price
+        price_bins = histogram_bins(clean_data['price'], nbins=30)
+        fig_price = px.bar(price_bins,
+                           x='center',
+                           y='count',
+                           title='Price Distribution with Market Segments',
+                           labels={'center': 'Price', 'count': 'Number of Products'})
+        fig_price.update_traces(width=price_bins['width'])
+
+        # Add vertical lines for market segments
+        fig_price.add_vline(x=clean_data['price'].quantile(0.33), 
+                          line_dash="dash", 
+                          annotation_text="Budget Segment")
+        fig_price.add_vline(x=clean_data['price'].quantile(0.66), 
+                          line_dash="dash", 
+                          annotation_text="Premium Segment")
+        plotly_chart(fig_price)
+
+    with col2:
+        # Rating vs Price with Review Volume (grid-aggregated for large catalogs)
+        rating_points = scatter_points(clean_data, 'price', 'rating', size='reviews')
+        fig_rating = px.scatter(rating_points, 
+                              x='price', 
+                              y='rating',
+                              size='reviews',
+                              hover_data=['products'],
+                              render_mode='webgl' if use_webgl(len(rating_points)) else 'auto',
+                              title='Price vs Rating (size = number of reviews)',
+                              labels={'price': 'Price', 
+                                    'rating': 'Rating',
+                                    'reviews': 'Number of Reviews',
+                                    'products': 'Products'})
+        plotly_chart(fig_rating)
+
+    # Feature Popularity
+    fig_features = go.Figure()
+    features = ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+    cube = get_aggregate_cube(catalog_version())
+    feature_counts = cube.feature_counts()
+    feature_ratings = cube.feature_means('rating')
+    for feature in features:
+        success_rate = feature_ratings[feature]
+        count = int(feature_counts[feature])
+        fig_features.add_trace(go.Bar(
+            name=feature,
+            x=[feature],
+            y=[count],
+            text=f"Avg Rating: {success_rate:.1f}⭐",
+            textposition='auto',
+        ))
+
+    fig_features.update_layout(
+        title='Feature Popularity and Success Rate',
+        showlegend=False
+    )
+    plotly_chart(fig_features)
+
+    # Market Insights from LLM
+    st.subheader("Market Insights")
+    market_placeholder = st.empty()
+    market_placeholder.markdown("*Generating market insights…*")
+    render_llm_streams([(market_stream, market_placeholder)])
+
+
+@st.fragment
+@traced("competitive_analysis_view")
+def competitive_analysis_view(user_product):
+    st.header("Competitive Analysis")
+
+    with span("find_similar_products", cache="hit"):
+        similar_products = find_similar_products(catalog_version(), user_product)
+    # Start the LLM call now so it runs while the product list renders
+    competitive_stream = LLMStream(
+        get_llm_executor(),
+        get_competitive_analysis(similar_products, user_product.to_dict(), get_llm_cache())
     )
-    return response.choices[0].message.content
 
+    # Create a row with heading and sort button
+    col1, col2, col3 = st.columns([0.4, 0.5, 0.1])
+    with col1:
+        st.subheader("Similar Products in Market")
+    with col3:
+        sort_option = st.selectbox(
+            "",
+            ["Similarity", "Reviews", "Rating", "Price"],
+            key="sort_similar_products",
+            label_visibility="collapsed",
+            help="Sort products by different metrics"
+        )
 
-def calculate_similarity(user_product, products_df):
-    """Calculate similarity between user product and existing products"""
-    features = ['price', 'Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
-    scaler = StandardScaler()
-    
-    # Convert user_product to DataFrame if it's not already
-    if not isinstance(user_product, pd.DataFrame):
-        user_product = pd.DataFrame(user_product, columns=features)
-    
-    products_features = scaler.fit_transform(products_df[features])
-    user_features = scaler.transform(user_product[features])
+    # Add some space after the header
+    st.write("")
+
+    # Sort a copy so the list sent to the LLM keeps its similarity order
+    similar_products_detailed = list(similar_products)
+    if sort_option == "Similarity":
+        similar_products_detailed.sort(key=lambda x: x['similarity_score'], reverse=True)
+    elif sort_option == "Reviews":
+        similar_products_detailed.sort(key=lambda x: x['reviews'], reverse=True)
+    elif sort_option == "Rating":
+        similar_products_detailed.sort(key=lambda x: x['rating'], reverse=True)
+    elif sort_option == "Price":
+        similar_products_detailed.sort(key=lambda x: x['price'])
+
+    # Display sorted similar products
+    for i, product in enumerate(similar_products_detailed, 1):
+        with st.expander(
+            f"#{i} - {product['title']} "
+            f"(Similarity: {product['similarity_score']:.2%}, "
+            f"Reviews: {int(product['reviews']):,}, "
+            f"Rating: {product['rating']:.1f}⭐)"
+        ):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Price:** ₹{:,.0f}".format(product['price']))
+                st.write("**Rating:** {:.1f}⭐".format(product['rating']))
+                st.write("**Reviews:** {:,.0f}".format(product['reviews']))
+                st.write("**Source:** ", product['source'])
+            with col2:
+                st.write("**Material:** ", product['features']['material'])
+                st.write("**Neck Type:** ", product['features']['neck_type'])
+                st.write("**Sleeve Type:** ", product['features']['sleeve_type'])
+
+            # Review growth and rating trend recomputed from the dated reviews
+            trends = product.get('review_trends', {})
+            for window in get_review_store(catalog_version()).windows:
+                line = "**Last {} days:** {:,.0f} reviews ({:.1%} of all)".format(
+                    window, trends.get(f'reviews_{window}d', 0), trends.get(f'growth_rate_{window}d', 0)
+                )
+                rating_trend = trends.get(f'rating_trend_{window}d', float('nan'))
+                if pd.notna(rating_trend):
+                    line += ", rating {:+.2f}⭐ vs. earlier".format(rating_trend)
+                st.write(line)
+
+            # Additional Information Section
+            st.write("---")
+
+            # Product details and additional features side by side
+            details_col1, details_col2 = st.columns(2)
+
+            with details_col1:
+                st.write("**📋 Product Details:**")
+                if product['product_details'] and pd.notna(product['product_details']):
+                    st.write(product['product_details'])
+                else:
+                    st.write("*No product details available*")
+
+            with details_col2:
+                st.write("**🔍 Additional Features:**")
+                if product['additional_features'] and pd.notna(product['additional_features']):
+                    st.write(product['additional_features'])
+                else:
+                    st.write("*No additional features available*")
+
+            # Product link at the bottom
+            st.write("**🔗 Product Link:**", product['product_link'])
+
+    # Get competitive analysis from LLM
+    st.subheader("Competitive Analysis")
+    competitive_placeholder = st.empty()
+    competitive_placeholder.markdown("*Generating competitive analysis…*")
+    render_llm_streams([(competitive_stream, competitive_placeholder)])
+
+
+@st.fragment
+@traced("product_insights_view")
+def product_insights_view(user_product):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    st.header("Product Insights")
+    with span("analyze_product_insights", cache="hit"):
+        insights = analyze_product_insights(catalog_version(), user_product)
+    price_analysis = insights["price_analysis"]
+    best_features = insights["best_features"]
     
-    similarities = cosine_similarity(user_features, products_features)
-    return similarities[0]
+    # Price Optimization
+    st.subheader("Price Optimization Analysis")
+    
+    fig_price_analysis = go.Figure()
+    fig_price_analysis.add_trace(go.Bar(
+        name='Average Rating',
+        x=[f"₹{int(i.left)}-{int(i.right)}" for i in price_analysis.index],
+        y=price_analysis['rating'],
+        yaxis='y1'
+    ))
+    fig_price_analysis.add_trace(go.Scatter(
+        name='Review Growth Rate',
+        x=[f"₹{int(i.left)}-{int(i.right)}" for i in price_analysis.index],
+        y=price_analysis['review_growth_rate'],
+        yaxis='y2'
+    ))
+    
+    fig_price_analysis.update_layout(
+        title='Price Range Performance Analysis',
+        yaxis=dict(title='Average Rating'),
+        yaxis2=dict(title='Review Growth Rate', overlaying='y', side='right')
+    )
+    plotly_chart(fig_price_analysis)
+    
+    # Feature Performance Analysis
+    st.subheader("Feature Performance Analysis")
+    
+    fig_feature_performance = px.parallel_coordinates(
+        insights["feature_performance"].T,
+        title='Feature Performance Comparison',
+        labels={
+            "rating": "Avg Rating",
+            "reviews": "Avg Reviews",
+            "review_growth_rate": "Review Growth",
+            "price": "Avg Price"
+        }
+    )
+    plotly_chart(fig_feature_performance)
+    
+    # Product Recommendations
+    st.subheader("Product Recommendations")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write(f"Your product is in the **{insights['user_segment']}** segment")
+        st.write("Segment Performance:")
+        st.dataframe(insights["segment_performance"])
+        
+    with col2:
+        # Feature recommendations visualization
+        fig_recommendations = px.bar(
+            best_features,
+            x='feature',
+            y=['success_rate', 'popularity'],
+            title='Feature Performance in Your Segment',
+            barmode='group'
+        )
+        plotly_chart(fig_recommendations)
+
+        # Display detailed recommendations
+        st.write("### Feature Recommendations")
+        for _, row in best_features.iterrows():
+            with st.expander(f"{row['feature']} Analysis"):
+                cols = st.columns(4)
+                cols[0].metric("Success Rate", f"{row['success_rate']:.1f}⭐")
+                cols[1].metric("Popularity", f"{row['popularity']:.1f}%")
+                cols[2].metric("Avg Price", f"₹{row['avg_price']:.0f}")
+                cols[3].metric("Growth Potential", f"{row['growth_potential']:.1%}")
+
+        st.write("### Competitiveness Analysis")
+        st.metric(
+            "Product Competitiveness Score", 
+            f"{insights['competitiveness_score']:.1f}%",
+            help="Based on alignment with top-performing features in your segment"
+        )
+
+        # Price optimization recommendations
+        st.write("### Price Optimization")
+        optimal_price_range = insights["optimal_price_range"]
+
+        price_cols = st.columns(3)
+        price_cols[0].metric("Recommended Price", f"₹{optimal_price_range['mean']:.0f}")
+        price_cols[1].metric("Min Profitable", f"₹{optimal_price_range['min']:.0f}")
+        price_cols[2].metric("Max Profitable", f"₹{optimal_price_range['max']:.0f}")
+
+        # Model-based sweep: predicted demand and revenue at every price on the ₹0-2000 grid
+        with span("price_sweep", cache="hit"):
+            model, _, _ = train_or_load_model(load_data())
+            sweep = get_price_sweep(model_version(model), float(user_product['review_growth_rate'].iloc[0]), model)
+        combo = int(feature_combination_codes(user_product)[0])
+
+        sweep_cols = st.columns(2)
+        sweep_cols[0].metric(
+            "Demand-Maximizing Price",
+            f"₹{sweep['best_demand_price'][combo]:.0f}",
+            help="Price with the highest predicted reviews for your material, neck and sleeve"
+        )
+        sweep_cols[1].metric(
+            "Revenue-Maximizing Price",
+            f"₹{sweep['best_revenue_price'][combo]:.0f}",
+            help="Price maximizing price × predicted reviews"
+        )
+
+        fig_sweep = go.Figure()
+        fig_sweep.add_trace(go.Scatter(
+            name='Predicted Demand',
+            x=sweep['prices'],
+            y=sweep['demand'][combo],
+            yaxis='y1'
+        ))
+        fig_sweep.add_trace(go.Scatter(
+            name='Predicted Revenue',
+            x=sweep['prices'],
+            y=sweep['revenue'][combo],
+            yaxis='y2'
+        ))
+        fig_sweep.update_layout(
+            title='Predicted Demand and Revenue by Price',
+            xaxis=dict(title='Price (₹)'),
+            yaxis=dict(title='Predicted Reviews'),
+            yaxis2=dict(title='Predicted Revenue (₹)', overlaying='y', side='right')
+        )
+        plotly_chart(fig_sweep)
+
+        # Demand prediction
+        st.write("### Demand Prediction")
+
+        st.metric(
+            "Predicted Demand Score", 
+            f"{insights['demand_score']:.1f}%",
+            help="Based on feature alignment, price optimization, and market growth"
+        )
+
+        # Show demand factors
+        st.write("#### Demand Factors")
+        for factor, value in insights["demand_factors"].items():
+            # Clamp the value between 0 and 1
+            clamped_value = max(0, min(1, value))
+            st.progress(clamped_value)
+            st.caption(factor.replace('_', ' ').title())
+
+
+@st.fragment
+@traced("demand_forecasting_view")
+def demand_forecasting_view(clean_data):
+    st.header("Demand & Trend Forecasting")
+
+    model, X_test, y_test = train_or_load_model(clean_data)
+    with span("generate_predictions", cache="hit"):
+        forecast = get_trend_predictions(
+            current_version(), catalog_version(), datetime.date.today(), model, clean_data, days_ahead=30,
+        )
+    # Visualize consumer behavior trends
+
+    forecast_future_demand(model,clean_data)
+    visualize_trends(clean_data, forecast)
+
+    # Analyze feature importance
+
+    feature_importance_analysis(model, clean_data)
+
 
 def main():
+    with trace("rerun", imports_ms=round(IMPORTS_MS, 3)) as current:
+        render_dashboard()
+        render_trace_panel(current)
+
+
+def render_dashboard():
     st.title("Product Analysis and Insights Dashboard")
     
-    clean_data, full_data = load_data()
+    with span("load_data", cache="hit"):
+        clean_data = load_data()
     
     # Sidebar for user input
     st.sidebar.header("Enter Your Product Details")
@@ -500,485 +891,28 @@ def main():
     sleeve_type = st.sidebar.selectbox("Sleeve Type", ["Short Sleeve", "Long Sleeve"])
     
 
-    user_product = pd.DataFrame({
-    'price': [price],
-    'review_growth_rate': [0],
-    'Cotton': [1 if material == "Cotton" else 0],
-    'Polyester': [1 if material == "Polyester" else 0],
-    'Round Neck': [1 if neck_type == "Round Neck" else 0],
-    'Polo Neck': [1 if neck_type == "Polo Neck" else 0],
-    'Short Sleeve': [1 if sleeve_type == "Short Sleeve" else 0],
-    'Long Sleeve': [1 if sleeve_type == "Long Sleeve" else 0]
-    })
+    user_product = make_user_product(price, material, neck_type, sleeve_type)
 
     
-    tab1, tab2, tab3, tab4 = st.tabs(["Market Overview", "Competitive Analysis", "Product Insights","Demand Prediction"])
-      
+    # With on_change="rerun" only the open tab reports .open, so the other views' pipelines are skipped
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["Market Overview", "Competitive Analysis", "Product Insights", "Demand Prediction"],
+        key="active_view",
+        on_change="rerun",
+    )
+
     with tab1:
-        st.header("Market Overview")
-        
-        # Market Statistics
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("Average Price", f"₹{clean_data['price'].mean():.2f}")
-        with col2:
-            st.metric("Average Rating", f"{clean_data['rating'].mean():.1f}⭐")
-        with col3:
-            st.metric("Total Products", len(clean_data))
-        with col4:
-            st.metric("Avg Review Growth", f"{clean_data['review_growth_rate'].mean():.2%}")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Price Distribution with Market Segments
-            fig_price = px.histogram(clean_data, x='price', 
-                                   nbins=30,
-                                   title='Price Distribution with Market Segments',
-                                   labels={'price': 'Price', 'count': 'Number of Products'})
-            
-            # Add vertical lines for market segments
-            fig_price.add_vline(x=clean_data['price'].quantile(0.33), 
-                              line_dash="dash", 
-                              annotation_text="Budget Segment")
-            fig_price.add_vline(x=clean_data['price'].quantile(0.66), 
-                              line_dash="dash", 
-                              annotation_text="Premium Segment")
-            st.plotly_chart(fig_price)
-            
-        with col2:
-            # Rating vs Price with Review Volume
-            fig_rating = px.scatter(clean_data, 
-                                  x='price', 
-                                  y='rating',
-                                  size='reviews',
-                                  title='Price vs Rating (size = number of reviews)',
-                                  labels={'price': 'Price', 
-                                        'rating': 'Rating',
-                                        'reviews': 'Number of Reviews'})
-            st.plotly_chart(fig_rating)
-        
-        # Feature Popularity
-        fig_features = go.Figure()
-        features = ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
-        for feature in features:
-            success_rate = clean_data[clean_data[feature] == 1]['rating'].mean()
-            count = clean_data[feature].sum()
-            fig_features.add_trace(go.Bar(
-                name=feature,
-                x=[feature],
-                y=[count],
-                text=f"Avg Rating: {success_rate:.1f}⭐",
-                textposition='auto',
-            ))
-        
-        fig_features.update_layout(
-            title='Feature Popularity and Success Rate',
-            showlegend=False
-        )
-        st.plotly_chart(fig_features)
-        
-        # Market Insights from LLM
-        st.subheader("Market Insights")
-        market_insights = get_market_insights(clean_data)
-        st.markdown(market_insights)
-        
+        if tab1.open:
+            market_overview_view(clean_data)
     with tab2:
-        st.header("Competitive Analysis")
-        
-        # Calculate similarities and get similar products
-        similarities = calculate_similarity(user_product, clean_data)
-        similar_indices = np.argsort(similarities)[::-1][:5]
-        
-        # Get detailed product information
-        similar_products_detailed = []
-        for idx in similar_indices:
-            clean_product = clean_data.iloc[idx]
-            full_product = full_data.iloc[idx]
-            
-            product_info = {
-                "title": full_product['title'],
-                "price": clean_product['price'],
-                "rating": clean_product['rating'],
-                "reviews": clean_product['reviews'],
-                "product_link": full_product['product_link'],
-                "source": full_product['source'],
-                "product_details": full_product['product_details'],
-                "additional_features": full_product['additional_features'],
-                "features": {
-                    "material": "Cotton" if clean_product['Cotton'] else "Polyester",
-                    "neck_type": "Round Neck" if clean_product['Round Neck'] else "Polo Neck",
-                    "sleeve_type": "Short Sleeve" if clean_product['Short Sleeve'] else "Long Sleeve"
-                },
-                "similarity_score": similarities[idx]
-            }
-            similar_products_detailed.append(product_info)
-        
-        # Create a row with heading and sort button
-        col1, col2, col3 = st.columns([0.4, 0.5, 0.1])
-        with col1:
-            st.subheader("Similar Products in Market")
-        with col3:
-            sort_option = st.selectbox(
-                "",
-                ["Similarity", "Reviews", "Rating", "Price"],
-                key="sort_similar_products",
-                label_visibility="collapsed",
-                help="Sort products by different metrics"
-            )
-            
-        # Add some space after the header
-        st.write("")
-        
-        # Sort the products based on selected option
-        if sort_option == "Similarity":
-            similar_products_detailed.sort(key=lambda x: x['similarity_score'], reverse=True)
-        elif sort_option == "Reviews":
-            similar_products_detailed.sort(key=lambda x: x['reviews'], reverse=True)
-        elif sort_option == "Rating":
-            similar_products_detailed.sort(key=lambda x: x['rating'], reverse=True)
-        elif sort_option == "Price":
-            similar_products_detailed.sort(key=lambda x: x['price'])
-        
-        # Display sorted similar products
-        for i, product in enumerate(similar_products_detailed, 1):
-            with st.expander(
-                f"#{i} - {product['title']} "
-                f"(Similarity: {product['similarity_score']:.2%}, "
-                f"Reviews: {int(product['reviews']):,}, "
-                f"Rating: {product['rating']:.1f}⭐)"
-            ):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write("**Price:** ₹{:,.0f}".format(product['price']))
-                    st.write("**Rating:** {:.1f}⭐".format(product['rating']))
-                    st.write("**Reviews:** {:,.0f}".format(product['reviews']))
-                    st.write("**Source:** ", product['source'])
-                with col2:
-                    st.write("**Material:** ", product['features']['material'])
-                    st.write("**Neck Type:** ", product['features']['neck_type'])
-                    st.write("**Sleeve Type:** ", product['features']['sleeve_type'])
-                
-                # Additional Information Section
-                st.write("---")
-                
-                # Product details and additional features side by side
-                details_col1, details_col2 = st.columns(2)
-                
-                with details_col1:
-                    st.write("**📋 Product Details:**")
-                    if product['product_details'] and pd.notna(product['product_details']):
-                        st.write(product['product_details'])
-                    else:
-                        st.write("*No product details available*")
-                        
-                with details_col2:
-                    st.write("**🔍 Additional Features:**")
-                    if product['additional_features'] and pd.notna(product['additional_features']):
-                        st.write(product['additional_features'])
-                    else:
-                        st.write("*No additional features available*")
-                
-                # Product link at the bottom
-                st.write("**🔗 Product Link:**", product['product_link'])
-        
-        # Get competitive analysis from LLM
-        st.subheader("Competitive Analysis")
-        competitive_insights = get_competitive_analysis(similar_products_detailed, user_product.to_dict())
-        st.markdown(competitive_insights)
-        
+        if tab2.open:
+            competitive_analysis_view(user_product)
     with tab3:
-        st.header("Product Insights")
-        
-        # Price Optimization
-        st.subheader("Price Optimization Analysis")
-        
-        # Create price ranges and analyze performance
-        price_ranges = pd.cut(clean_data['price'], bins=5, duplicates='drop')
-        price_analysis = clean_data.groupby(price_ranges).agg({
-            'rating': 'mean',
-            'reviews': 'mean',
-            'review_growth_rate': 'mean'
-        }).round(2)
-        
-        fig_price_analysis = go.Figure()
-        fig_price_analysis.add_trace(go.Bar(
-            name='Average Rating',
-            x=[f"₹{int(i.left)}-{int(i.right)}" for i in price_analysis.index],
-            y=price_analysis['rating'],
-            yaxis='y1'
-        ))
-        fig_price_analysis.add_trace(go.Scatter(
-            name='Review Growth Rate',
-            x=[f"₹{int(i.left)}-{int(i.right)}" for i in price_analysis.index],
-            y=price_analysis['review_growth_rate'],
-            yaxis='y2'
-        ))
-        
-        fig_price_analysis.update_layout(
-            title='Price Range Performance Analysis',
-            yaxis=dict(title='Average Rating'),
-            yaxis2=dict(title='Review Growth Rate', overlaying='y', side='right')
-        )
-        st.plotly_chart(fig_price_analysis)
-        
-        # Feature Performance Analysis
-        st.subheader("Feature Performance Analysis")
-        
-        feature_performance = pd.DataFrame()
-        for feature in ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']:
-            performance = clean_data.groupby(feature).agg({
-                'rating': 'mean',
-                'reviews': 'mean',
-                'review_growth_rate': 'mean',
-                'price': 'mean'
-            }).round(2)
-            
-            # Check if 1 exists in the index before accessing it
-            if 1 in performance.index:
-                feature_performance[feature] = performance.loc[1]
-            else:
-                # Handle the case where the feature value 1 doesn't exist
-                feature_performance[feature] = pd.Series({
-                    'rating': 0,
-                    'reviews': 0,
-                    'review_growth_rate': 0,
-                    'price': 0
-                })
-        
-        fig_feature_performance = px.parallel_coordinates(
-            feature_performance.T,
-            title='Feature Performance Comparison',
-            labels={
-                "rating": "Avg Rating",
-                "reviews": "Avg Reviews",
-                "review_growth_rate": "Review Growth",
-                "price": "Avg Price"
-            }
-        )
-        st.plotly_chart(fig_feature_performance)
-        
-        # Product Recommendations
-        st.subheader("Product Recommendations")
-        
-        # Calculate optimal price range
-        user_price = user_product['price'].values[0]
-        price_segment = pd.cut(clean_data['price'], bins=5, labels=['Budget', 'Economy', 'Mid-Range', 'Premium', 'Luxury'], duplicates='drop')
-        user_segment = pd.cut([user_price], bins=5, labels=['Budget', 'Economy', 'Mid-Range', 'Premium', 'Luxury'])[0]
-        
-        segment_performance = clean_data.groupby(price_segment).agg({
-            'rating': 'mean',
-            'reviews': 'mean',
-            'review_growth_rate': 'mean'
-        }).round(2)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.write(f"Your product is in the **{user_segment}** segment")
-            st.write("Segment Performance:")
-            st.dataframe(segment_performance)
-            
-        with col2:
-            # Feature recommendations based on segment
-            segment_features = clean_data[clean_data['price'].between(
-                clean_data['price'].quantile(0.2 * (price_segment.cat.categories.tolist().index(user_segment))),
-                clean_data['price'].quantile(0.2 * (price_segment.cat.categories.tolist().index(user_segment) + 1))
-            )]
-            
-            best_features = pd.DataFrame({
-                'feature': features,
-                'success_rate': [
-                    segment_features[segment_features[f] == 1]['rating'].mean() 
-                    for f in features
-                ],
-                'popularity': [
-                    segment_features[f].sum() / len(segment_features) * 100 
-                    for f in features
-                ],
-                'avg_price': [
-                    segment_features[segment_features[f] == 1]['price'].mean() 
-                    for f in features
-                ],
-                'review_engagement': [
-                    segment_features[segment_features[f] == 1]['reviews'].mean() 
-                    for f in features
-                ],
-                'growth_potential': [
-                    segment_features[segment_features[f] == 1]['review_growth_rate'].mean() 
-                    for f in features
-                ]
-            }).sort_values('success_rate', ascending=False)
-
-            # Feature recommendations visualization
-            fig_recommendations = px.bar(
-                best_features,
-                x='feature',
-                y=['success_rate', 'popularity'],
-                title='Feature Performance in Your Segment',
-                barmode='group'
-            )
-            st.plotly_chart(fig_recommendations)
-
-            # Display detailed recommendations
-            st.write("### Feature Recommendations")
-            for _, row in best_features.iterrows():
-                with st.expander(f"{row['feature']} Analysis"):
-                    cols = st.columns(4)
-                    cols[0].metric("Success Rate", f"{row['success_rate']:.1f}⭐")
-                    cols[1].metric("Popularity", f"{row['popularity']:.1f}%")
-                    cols[2].metric("Avg Price", f"₹{row['avg_price']:.0f}")
-                    cols[3].metric("Growth Potential", f"{row['growth_potential']:.1%}")
-
-            # Add competitiveness score
-            user_features = set([
-                col for col in ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 
-                              'Short Sleeve', 'Long Sleeve'] 
-                if user_product[col].values[0] == 1
-            ])
-            
-            top_features = set(
-                best_features.nlargest(3, 'success_rate')['feature'].values
-            )
-            
-            competitiveness_score = len(user_features.intersection(top_features)) / 3 * 100
-            
-            st.write("### Competitiveness Analysis")
-            st.metric(
-                "Product Competitiveness Score", 
-                f"{competitiveness_score:.1f}%",
-                help="Based on alignment with top-performing features in your segment"
-            )
-
-            # Price optimization recommendations
-            st.write("### Price Optimization")
-            optimal_price_range = segment_features[
-                segment_features['rating'] >= segment_features['rating'].quantile(0.75)
-            ]['price'].agg(['mean', 'min', 'max'])
-
-            price_cols = st.columns(3)
-            price_cols[0].metric("Recommended Price", f"₹{optimal_price_range['mean']:.0f}")
-            price_cols[1].metric("Min Profitable", f"₹{optimal_price_range['min']:.0f}")
-            price_cols[2].metric("Max Profitable", f"₹{optimal_price_range['max']:.0f}")
-
-            # Demand prediction
-            st.write("### Demand Prediction")
-            
-            # Calculate demand score based on feature popularity and review growth
-            demand_factors = {
-                'feature_alignment': competitiveness_score / 100,
-                'price_optimization': 1 - abs(user_product['price'].values[0] - optimal_price_range['mean']) / optimal_price_range['mean'],
-                'market_growth': segment_features['review_growth_rate'].mean()
-            }
-            
-            demand_score = (
-                demand_factors['feature_alignment'] * 0.4 +
-                demand_factors['price_optimization'] * 0.3 +
-                demand_factors['market_growth'] * 0.3
-            ) * 100
-
-            st.metric(
-                "Predicted Demand Score", 
-                f"{demand_score:.1f}%",
-                help="Based on feature alignment, price optimization, and market growth"
-            )
-
-            # Show demand factors
-            st.write("#### Demand Factors")
-            for factor, value in demand_factors.items():
-                # Clamp the value between 0 and 1
-                clamped_value = max(0, min(1, value))
-                st.progress(clamped_value)
-                st.caption(factor.replace('_', ' ').title())
-  
-    # with tab4:
-    #     display_demand_prediction_tab(clean_data, user_product)
+        if tab3.open:
+            product_insights_view(user_product)
     with tab4:
-        st.header("Demand & Trend Forecasting")
-        
-        model, X_test, y_test = train_or_load_model(clean_data)
-        predictions_df = generate_predictions(model, clean_data, days_ahead=30)
-        # Visualize consumer behavior trends
-     
-        forecast_future_demand(model,clean_data)
-        visualize_trends(clean_data, predictions_df)
-        
-        # Analyze feature importance
-        
-        feature_importance_analysis(model, clean_data)
-        
-        
-
-
-
-def create_market_analysis_prompt(market_summary):
-    # Convert all numpy types to Python native types
-    market_summary = convert_numpy_types(market_summary)
-    return f"""
-    Analyze the following apparel market data and provide strategic insights:
-    {json.dumps(market_summary, indent=2)}
-    
-    Focus on:
-    1. Market positioning analysis
-    - Price point optimization
-    - Competition intensity
-    - Market share opportunities
-    
-    2. Feature analysis
-    - Most successful feature combinations
-    - Underserved feature segments
-    - Feature pricing premiums
-    
-    3. Growth opportunities
-    - High-growth segments
-    - Emerging trends
-    - Market gaps
-    
-    4. Specific recommendations
-    - Pricing strategy
-    - Feature selection
-    - Market positioning
-    
-    Provide data-driven insights and actionable recommendations.
-    """
-
-def create_competitive_analysis_prompt(similar_products_data, user_product):
-    # Convert all numpy types to Python native types
-    user_product = convert_numpy_types(user_product)
-    similar_products_data = convert_numpy_types(similar_products_data)
-    
-    return f"""
-    Analyze the competitive landscape for this product:
-    
-    Target Product:
-    {json.dumps(user_product, indent=2)}
-    
-    Competitor Products:
-    {json.dumps(similar_products_data, indent=2)}
-    
-    Provide insights on:
-    1. Competitive Position
-    - Price positioning relative to competitors
-    - Feature differentiation
-    - Rating and review performance
-    
-    2. Market Opportunities
-    - Underserved features or segments
-    - Price optimization potential
-    - Review growth patterns
-    
-    3. Competitive Advantages
-    - Unique selling propositions
-    - Price-feature balance
-    - Market reception
-    
-    4. Strategic Recommendations
-    - Immediate improvements
-    - Long-term positioning
-    - Feature optimization
-    
-    Format as clear sections with specific, actionable insights.
-    """
+        if tab4.open:
+            demand_forecasting_view(clean_data)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,146 @@
+"""Precomputed demand response surface for the interactive strategy inputs.
+
+The Product Strategy Tool only accepts integer prices 0-2000, one of eight
+material/neck/sleeve combinations and a growth rate from a bounded slider.
+The surface evaluates the model on that whole grid in one batched predict
+call, so an interactive lookup is array indexing (with linear interpolation
+between growth-rate grid points) instead of a DataFrame build plus a model
+call per widget change. Every value the dashboard widgets can produce
+(integer prices, growth rates in 0.01 steps) is a grid point, where the
+surface equals ``model.predict`` exactly; ``on_grid`` tells callers when an
+input falls between grid points, so they can use the compiled trees
+(fast_inference) instead of interpolating.
+
+``price_sweep`` evaluates the model exactly at one growth rate over the
+whole price grid for all eight combinations in one batched in-place
+predict, giving the demand and revenue curves and their argmax prices.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import temp_path
+from forecasting import TRAINING_COLUMNS
+
+PRICE_GRID = np.arange(0, 2001, dtype=np.float32)
+GROWTH_GRID = np.linspace(0.0, 0.5, 51, dtype=np.float64)
+SURFACE_DIR = os.environ.get("DEMAND_SURFACE_DIR", os.path.join(".cache", "models"))
+
+
+def model_version(model):
+    """Content hash of the trained booster, used to key artifacts derived from it."""
+    return hashlib.sha256(bytes(model.get_booster().save_raw("ubj"))).hexdigest()[:16]
+
+
+def combination_code(material, neck_type, sleeve_type):
+    """Index 0-7 of a material/neck/sleeve choice (Cotton * 4 + Round Neck * 2 + Short Sleeve)."""
+    return (material == "Cotton") * 4 + (neck_type == "Round Neck") * 2 + (sleeve_type == "Short Sleeve")
+
+
+def _grid_features(combo, growth, price):
+    cotton = (combo >> 2) & 1
+    round_neck = (combo >> 1) & 1
+    short_sleeve = combo & 1
+    return pd.DataFrame({
+        'price': price,
+        'review_growth_rate': growth,
+        'Cotton': cotton,
+        'Polyester': 1 - cotton,
+        'Round Neck': round_neck,
+        'Polo Neck': 1 - round_neck,
+        'Short Sleeve': short_sleeve,
+        'Long Sleeve': 1 - short_sleeve,
+    })[TRAINING_COLUMNS]
+
+
+def surface_features():
+    """Feature rows for every (combination, growth rate, price) grid point, in surface order."""
+    combo, growth, price = np.meshgrid(np.arange(8), GROWTH_GRID, PRICE_GRID, indexing="ij")
+    return _grid_features(combo.ravel(), growth.ravel(), price.ravel())
+
+
+def build_surface(model):
+    """Predicted demand on the full grid, shaped (combination, growth rate, price)."""
+    predictions = model.predict(surface_features())
+    return np.asarray(predictions, dtype=np.float32).reshape(8, len(GROWTH_GRID), len(PRICE_GRID))
+
+
+def load_or_build_surface(model, version, directory=SURFACE_DIR):
+    """Load the persisted surface for a model version, building and saving it on first use."""
+    path = os.path.join(directory, f"demand_surface-{version}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+    surface = build_surface(model)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = temp_path(path, suffix=".tmp.npy")
+    np.save(tmp_path, surface)
+    os.replace(tmp_path, path)
+    return surface
+
+
+def on_grid(price, review_growth_rate):
+    """True if price and review_growth_rate are exactly a surface grid point."""
+    step = float(GROWTH_GRID[1] - GROWTH_GRID[0])
+    growth_position = (review_growth_rate - float(GROWTH_GRID[0])) / step
+    return (
+        float(price) == round(float(price))
+        and float(PRICE_GRID[0]) <= price <= float(PRICE_GRID[-1])
+        and abs(growth_position - round(growth_position)) < 1e-6
+        and 0 <= round(growth_position) < len(GROWTH_GRID)
+    )
+
+
+def lookup_demand(surface, price, review_growth_rate, material, neck_type, sleeve_type):
+    """Predicted demand for one configuration, read from the surface."""
+    combo = combination_code(material, neck_type, sleeve_type)
+    price_idx = min(max(int(round(price)), 0), len(PRICE_GRID) - 1)
+
+    # Linear interpolation between the two nearest growth-rate grid points
+    step = float(GROWTH_GRID[1] - GROWTH_GRID[0])
+    position = min(max((review_growth_rate - float(GROWTH_GRID[0])) / step, 0.0), len(GROWTH_GRID) - 1.0)
+    lower = int(position)
+    upper = min(lower + 1, len(GROWTH_GRID) - 1)
+    weight = position - lower
+    if weight < 1e-9:
+        return float(surface[combo, lower, price_idx])
+    return float((1 - weight) * surface[combo, lower, price_idx] + weight * surface[combo, upper, price_idx])
+
+
+def lookup_product_demand(surface, user_product):
+    """Surface lookup for a one-row product frame built from the dashboard inputs."""
+    row = user_product.iloc[0]
+    return lookup_demand(
+        surface,
+        row['price'],
+        row['review_growth_rate'],
+        "Cotton" if row['Cotton'] == 1 else "Polyester",
+        "Round Neck" if row['Round Neck'] == 1 else "Polo Neck",
+        "Short Sleeve" if row['Short Sleeve'] == 1 else "Long Sleeve",
+    )
+
+
+def price_sweep(model, review_growth_rate, codes=None, prices=PRICE_GRID):
+    """Predicted demand and revenue over prices for each combination code, from one batched predict.
+
+    Returns the price grid, the codes, demand and revenue shaped (codes,
+    prices), and per code the price maximizing each of them.
+    """
+    codes = np.arange(8) if codes is None else np.atleast_1d(np.asarray(codes, dtype=np.int64))
+    prices = np.asarray(prices, dtype=np.float32)
+    combo, price = np.meshgrid(codes, prices, indexing="ij")
+    features = _grid_features(combo.ravel(), np.float32(review_growth_rate), price.ravel())
+    # In-place prediction on the float32 matrix skips the DataFrame validation and DMatrix copy
+    demand = np.asarray(
+        model.get_booster().inplace_predict(features.to_numpy(dtype=np.float32)), dtype=np.float32
+    ).reshape(len(codes), len(prices))
+    revenue = demand * prices
+    return {
+        "prices": prices,
+        "codes": codes,
+        "demand": demand,
+        "revenue": revenue,
+        "best_demand_price": prices[demand.argmax(axis=1)],
+        "best_revenue_price": prices[revenue.argmax(axis=1)],
+    }
@@ -0,0 +1,143 @@
+"""Streaming ETL from the raw scrape to the cleaned feature table.
+
+Rebuilds ``Final_Cleaned_and_Structured_Dataset.csv`` from
+``product_data_with_details.csv``:
+
+* ``price``: the "₹1,299.00" text parsed to a number
+* ``rating`` and ``reviews``: copied through
+* ``review_growth_rate``: parsed reviews per day between the oldest and
+  newest entry of ``detailed_reviews`` (0 with fewer than two distinct days)
+* Cotton/Polyester/Round Neck/Polo Neck/Short Sleeve/Long Sleeve: 1 if the
+  ``product_details`` tokens mention the feature
+
+The scrape is read in chunks of ``chunk_rows`` rows, so memory stays bounded
+by the chunk size, and chunks can be transformed on a process pool. Output
+rows keep the input order, one cleaned row per scraped row, so the two files
+stay row-aligned.
+
+    python etl.py                                   # raw CSV -> cleaned CSV
+    python etl.py scrape.csv cleaned.parquet --workers 8
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from catalog_store import CLEAN_CSV, DETAILS_CSV, FEATURE_COLUMNS, temp_path
+from reviews import parse_reviews
+
+CHUNK_ROWS = 100_000
+CLEAN_COLUMNS = ['price', 'rating', 'reviews', 'review_growth_rate'] + FEATURE_COLUMNS
+RAW_COLUMNS = ['price', 'rating', 'reviews', 'product_details', 'detailed_reviews']
+
+# Case-insensitive substring of product_details that sets each feature flag
+FEATURE_KEYWORDS = {
+    'Cotton': 'cotton',
+    'Polyester': 'polyester',
+    'Round Neck': 'round neck',
+    'Polo Neck': 'polo',
+    'Short Sleeve': 'short sleeve',
+    'Long Sleeve': 'long sleeve',
+}
+
+
+def parse_price(prices):
+    """Parse price text like "₹1,299.00" to float (NaN if there is no number)."""
+    return pd.to_numeric(prices.astype(str).str.replace(r"[^0-9.]", "", regex=True), errors="coerce")
+
+
+def review_growth_rate(detailed_reviews):
+    """Parsed reviews per day between each product's oldest and newest review."""
+    product, _, day = parse_reviews(detailed_reviews)
+    n = len(detailed_reviews)
+    count = np.bincount(product, minlength=n)
+    oldest = np.full(n, np.iinfo(np.int32).max, dtype=np.int64)
+    newest = np.full(n, np.iinfo(np.int32).min, dtype=np.int64)
+    np.minimum.at(oldest, product, day)
+    np.maximum.at(newest, product, day)
+    span = np.where(count > 0, newest - oldest, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(span > 0, count / span, 0.0)
+
+
+def transform_chunk(raw):
+    """Cleaned feature rows for one chunk of the raw scrape."""
+    details = raw['product_details'].fillna("").str.lower()
+    cleaned = pd.DataFrame({
+        'price': parse_price(raw['price']),
+        'rating': raw['rating'],
+        'reviews': raw['reviews'],
+        'review_growth_rate': review_growth_rate(raw['detailed_reviews'].reset_index(drop=True)),
+    }, index=raw.index)
+    for feature, keyword in FEATURE_KEYWORDS.items():
+        cleaned[feature] = details.str.contains(keyword, regex=False).astype(np.int64)
+    return cleaned[CLEAN_COLUMNS]
+
+
+def _transformed_chunks(raw_path, chunk_rows, workers):
+    reader = pd.read_csv(raw_path, usecols=RAW_COLUMNS, chunksize=chunk_rows)
+    if workers == 1:
+        for raw in reader:
+            yield transform_chunk(raw)
+        return
+    workers = workers or os.cpu_count() or 1
+    # Keep at most two chunks per worker in flight so memory stays bounded
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for raw in reader:
+            pending.append(pool.submit(transform_chunk, raw))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_etl(raw_path=DETAILS_CSV, out_path=CLEAN_CSV, chunk_rows=CHUNK_ROWS, workers=1):
+    """Stream raw_path through transform_chunk into out_path (.csv or .parquet); return the row count."""
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = temp_path(out_path)
+    rows = 0
+    writer = None
+    try:
+        for index, cleaned in enumerate(_transformed_chunks(raw_path, chunk_rows, workers)):
+            if out_path.endswith(".parquet"):
+                table = pa.Table.from_pandas(cleaned, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            else:
+                cleaned.to_csv(tmp_path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+            rows += len(cleaned)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    if rows == 0 and out_path.endswith(".parquet"):
+        pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=CLEAN_COLUMNS), preserve_index=False), tmp_path)
+    elif rows == 0:
+        pd.DataFrame(columns=CLEAN_COLUMNS).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the cleaned feature table from the raw scrape.")
+    parser.add_argument("raw", nargs="?", default=DETAILS_CSV)
+    parser.add_argument("out", nargs="?", default=CLEAN_CSV, help=".csv or .parquet")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes transforming chunks in parallel (0: all cores)")
+    args = parser.parse_args(argv)
+    rows = run_etl(args.raw, args.out, args.chunk_rows, args.workers)
+    print(f"wrote {rows} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Out-of-core training of the demand model, streamed from the catalog store.
+
+``model_registry.train_model`` needs the whole clean table in one DataFrame,
+so the training set is capped by RAM. Here ``clean.parquet`` is read in
+batches of ``BATCH_ROWS`` rows through an XGBoost ``DataIter``.
+``ExtMemQuantileDMatrix`` sketches the feature quantiles batch by batch and
+keeps the binned pages in a disk cache, so memory holds about one batch plus
+the pages being trained on, not the catalog.
+
+Rows are held out by ``HOLDOUT_RULE`` on their product ID, decided batch
+by batch, so neither memory nor the manifest grows with a list of held-out
+positions. A second batched pass scores the held-out rows and hashes the rows
+for the dataset fingerprint. The fingerprint is the one ``train_model``
+records, so the dashboard and incremental updates treat the version like any
+other, and updates keep applying the rule to appended rows.
+
+    python retrain.py --external                  # full retrain, tuned (or default) params
+    python retrain.py --external --batch-rows 1000000
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import xgboost
+
+from catalog_store import STORE_DIR, iter_table_batches
+from forecasting import TRAINING_COLUMNS
+from model_registry import (
+    DEFAULT_PARAMS, HOLDOUT_RULE, REGISTRY_DIR, TARGET_COLUMN, holdout_mask, register_model, row_hashes,
+    tuned_params,
+)
+
+BATCH_ROWS = 500_000
+PAGE_CACHE_DIR = os.path.join(".cache", "xgb_pages")
+COLUMNS = TRAINING_COLUMNS + [TARGET_COLUMN, HOLDOUT_RULE["column"]]
+
+
+class CatalogBatches(xgboost.DataIter):
+    """The clean table's training columns and target, batch by batch, without the held-out rows."""
+
+    def __init__(self, batch_rows=BATCH_ROWS, store_dir=STORE_DIR, cache_prefix=None):
+        self.batch_rows = batch_rows
+        self.store_dir = store_dir
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter_table_batches("clean", COLUMNS, self.batch_rows, self.store_dir)
+        for _, frame in self._batches:
+            mask = ~holdout_mask(frame[HOLDOUT_RULE["column"]].to_numpy())
+            if mask.any():
+                # A DataFrame, so the booster records the same feature names and types as XGBRegressor.fit
+                rows = frame.loc[mask]
+                input_data(data=rows[TRAINING_COLUMNS], label=rows[TARGET_COLUMN])
+                return True
+        return False
+
+
+def booster_params(params):
+    """(xgboost.train parameters, boosting rounds) for XGBRegressor-style params."""
+    native = dict(params)
+    rounds = native.pop("n_estimators", DEFAULT_PARAMS["n_estimators"])
+    if "random_state" in native:
+        native["seed"] = native.pop("random_state")
+    if "n_jobs" in native:
+        native["nthread"] = native.pop("n_jobs")
+    native.setdefault("objective", "reg:squarederror")
+    # External-memory matrices are only supported by the histogram method
+    native["tree_method"] = "hist"
+    return native, rounds
+
+
+def score_and_fingerprint(booster, batch_rows=BATCH_ROWS, store_dir=STORE_DIR):
+    """(row count, dataset fingerprint, held-out metrics) in one batched pass over the clean table."""
+    digest = hashlib.sha256()
+    n_rows, n, squared_error, total, total_squares = 0, 0, 0.0, 0.0, 0.0
+    for _, frame in iter_table_batches("clean", COLUMNS, batch_rows, store_dir):
+        # Row hashes are per row, so hashing batch by batch equals dataset_fingerprint on the whole table
+        digest.update(row_hashes(frame).tobytes())
+        n_rows += len(frame)
+        mask = holdout_mask(frame[HOLDOUT_RULE["column"]].to_numpy())
+        if not mask.any():
+            continue
+        rows = frame.loc[mask]
+        y = rows[TARGET_COLUMN].to_numpy(dtype=np.float64)
+        y_pred = booster.inplace_predict(rows[TRAINING_COLUMNS]).astype(np.float64)
+        n += len(y)
+        squared_error += float(np.sum((y - y_pred) ** 2))
+        total += float(y.sum())
+        total_squares += float(np.sum(y ** 2))
+    total_variance = total_squares - total * total / n if n else 0.0
+    metrics = {
+        "mse": squared_error / n if n else float("nan"),
+        "r2": 1 - squared_error / total_variance if total_variance > 0 else float("nan"),
+    }
+    return n_rows, digest.hexdigest(), metrics
+
+
+def train_external(params=None, registry_dir=REGISTRY_DIR, batch_rows=BATCH_ROWS, store_dir=STORE_DIR,
+                   make_current=True):
+    """Train on the catalog store without loading it, register the result and return (version, manifest)."""
+    if params is None:
+        params = tuned_params(registry_dir) or DEFAULT_PARAMS
+    native, rounds = booster_params(params)
+    os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+    cache_dir = tempfile.mkdtemp(dir=PAGE_CACHE_DIR)
+    try:
+        batches = CatalogBatches(batch_rows, store_dir, os.path.join(cache_dir, "train"))
+        dtrain = xgboost.ExtMemQuantileDMatrix(
+            batches, max_bin=native.get("max_bin"), nthread=native.get("nthread"),
+        )
+        booster = xgboost.train(native, dtrain, num_boost_round=rounds)
+        del dtrain
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    n_rows, fingerprint, metrics = score_and_fingerprint(booster, batch_rows, store_dir)
+    return register_model(
+        booster, fingerprint, n_rows, {"holdout": HOLDOUT_RULE}, params, metrics, registry_dir, make_current,
+        mode="external", batch_rows=batch_rows,
+    )
+
@@ -0,0 +1,164 @@
+"""Microsecond demand predictions from a flattened copy of the XGBoost trees.
+
+``XGBRegressor.predict`` on one row validates a DataFrame, builds a DMatrix
+and dispatches to the C++ predictor, which costs milliseconds while the
+actual tree walk is a few hundred comparisons. ``CompiledModel`` copies every
+tree of the booster into flat NumPy node arrays (split feature, threshold,
+children, leaf value) and walks all trees at once, one depth level per step,
+on a float32 feature vector. The leaf values are added up in tree order in
+float32, as XGBoost does, so results agree with ``model.predict``;
+``compile_model`` checks that on a fixed set of probe rows before returning.
+
+    compiled = compile_model(model)
+    x = feature_vector(499, 0.1, "Cotton", "Round Neck", "Short Sleeve")
+    compiled.predict_one(x)          # one row, no DataFrame
+    compiled.predict(features)       # (n, 8) float32 matrix
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from forecasting import TRAINING_COLUMNS
+
+# Largest |compiled - model.predict| accepted by compile_model, relative to the prediction scale
+VERIFY_RTOL = 1e-5
+PROBE_ROWS = 512
+
+
+class CompiledModel:
+    """All trees of a regression booster as flat node arrays."""
+
+    def __init__(self, roots, feature, threshold, left, right, default_left, leaf_value, depth, base_score):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        # Leaves point at themselves, so walking past a shallow tree's leaf is a no-op
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.depth = depth
+        self.base_score = np.float32(base_score)
+        self._base = np.array([base_score], dtype=np.float32)
+        self.n_features = len(TRAINING_COLUMNS)
+
+    @classmethod
+    def from_booster(cls, booster):
+        learner = json.loads(bytes(booster.save_raw("json")))["learner"]
+        params = learner["learner_model_param"]
+        if int(params.get("num_class", 0)) > 1 or int(params.get("num_target", 1)) != 1:
+            raise ValueError("only single-output regression boosters can be compiled")
+        if learner["objective"]["name"] != "reg:squarederror":
+            raise ValueError(f"objective {learner['objective']['name']} has a non-identity link")
+        base_score = float(params["base_score"].strip("[]"))
+
+        roots, feature, threshold, left, right, default_left, leaf_value = [], [], [], [], [], [], []
+        offset = 0
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            if any(tree["split_type"]):
+                raise ValueError("categorical splits are not supported")
+            tree_left = np.array(tree["left_children"], dtype=np.int64)
+            is_leaf = tree_left == -1
+            own = np.arange(len(tree_left)) + offset
+            conditions = np.array(tree["split_conditions"], dtype=np.float32)
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            threshold.append(np.where(is_leaf, np.float32(np.inf), conditions))
+            left.append(np.where(is_leaf, own, tree_left + offset))
+            right.append(np.where(is_leaf, own, np.array(tree["right_children"]) + offset))
+            default_left.append(np.array(tree["default_left"], dtype=bool))
+            leaf_value.append(np.where(is_leaf, conditions, np.float32(0)))
+            offset += len(tree_left)
+
+        left = np.concatenate(left).astype(np.int32)
+        right = np.concatenate(right).astype(np.int32)
+        roots = np.array(roots, dtype=np.int32)
+        return cls(
+            roots, np.concatenate(feature).astype(np.int32), np.concatenate(threshold).astype(np.float32),
+            left, right, np.concatenate(default_left), np.concatenate(leaf_value).astype(np.float32),
+            _max_depth(roots, left, right), base_score,
+        )
+
+    def predict_one(self, x):
+        """Prediction for one float32 feature vector in TRAINING_COLUMNS order."""
+        if np.isnan(x).any():
+            return float(self.predict(x[None, :])[0])
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        nodes = self.roots
+        for _ in range(self.depth):
+            nodes = np.where(x[feature[nodes]] < threshold[nodes], left[nodes], right[nodes])
+        # np.cumsum adds sequentially, so the float32 rounding matches tree-by-tree accumulation
+        return float(np.cumsum(np.concatenate((self._base, self.leaf_value[nodes])))[-1])
+
+    def predict(self, features):
+        """Predictions (float32) for an (n, n_features) matrix, same order as model.predict."""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        rows = np.arange(len(features))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(features), len(self.roots)))
+        for _ in range(self.depth):
+            values = features[rows, self.feature[nodes]]
+            go_left = (values < self.threshold[nodes]) | (np.isnan(values) & self.default_left[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaves = self.leaf_value[nodes]
+        # Tree by tree, like XGBoost's float32 accumulation
+        total = np.full(len(features), self.base_score, dtype=np.float32)
+        for tree in range(leaves.shape[1]):
+            total += leaves[:, tree]
+        return total
+
+
+def _max_depth(roots, left, right):
+    # Levels until every path from every root has reached a leaf
+    depth, frontier = 0, roots
+    while True:
+        internal = frontier[left[frontier] != frontier]
+        if len(internal) == 0:
+            return depth
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth += 1
+
+
+def feature_vector(price, review_growth_rate, material, neck_type, sleeve_type, out=None):
+    """Float32 feature vector for the sidebar-style inputs, written into out if given."""
+    if out is None:
+        out = np.empty(len(TRAINING_COLUMNS), dtype=np.float32)
+    cotton = material == "Cotton"
+    round_neck = neck_type == "Round Neck"
+    short_sleeve = sleeve_type == "Short Sleeve"
+    out[:] = (price, review_growth_rate, cotton, not cotton, round_neck, not round_neck, short_sleeve, not short_sleeve)
+    return out
+
+
+def product_vector(user_product):
+    """Float32 feature vector of a one-row product frame."""
+    return user_product[TRAINING_COLUMNS].to_numpy(dtype=np.float32)[0]
+
+
+def probe_features(n=PROBE_ROWS, seed=0):
+    """Fixed rows covering the input ranges (plus missing values) used to verify a compiled model."""
+    rng = np.random.default_rng(seed)
+    flags = rng.integers(0, 2, (n, 3))
+    features = np.column_stack([
+        rng.uniform(0, 3000, n).round(), rng.uniform(0, 1, n),
+        flags[:, 0], 1 - flags[:, 0], flags[:, 1], 1 - flags[:, 1], flags[:, 2], 1 - flags[:, 2],
+    ]).astype(np.float32)
+    features[: n // 16, 1] = np.nan
+    return features
+
+
+def verify(compiled, model, features):
+    """Largest absolute difference between compiled and model.predict on features."""
+    expected = np.asarray(model.predict(pd.DataFrame(features, columns=TRAINING_COLUMNS)), dtype=np.float32)
+    return float(np.max(np.abs(compiled.predict(features) - expected), initial=0.0)), expected
+
+
+def compile_model(model):
+    """CompiledModel of a fitted XGBRegressor, checked against model.predict on the probe rows."""
+    compiled = CompiledModel.from_booster(model.get_booster())
+    features = probe_features()
+    difference, expected = verify(compiled, model, features)
+    scale = max(float(np.max(np.abs(expected), initial=0.0)), 1.0)
+    if difference > VERIFY_RTOL * scale:
+        raise ValueError(f"compiled trees disagree with model.predict by {difference:g}")
+    return compiled
@@ -0,0 +1,96 @@
+"""Vectorized demand forecast over the whole catalog.
+
+The demand model has no date feature, so a product's predicted reviews are
+the same on every day of the horizon. The forecast therefore predicts each
+distinct feature row once, keeps one value per product and only broadcasts
+across dates when a per-date view is actually needed.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+TRAINING_COLUMNS = ['price', 'review_growth_rate', 'Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+CHUNK_ROWS = 250_000
+
+# Feature combination code = Cotton * 4 + Round Neck * 2 + Short Sleeve; a 0 flag
+# means the alternative value, as in the dashboard's labels
+MATERIALS = np.array(["Polyester", "Cotton"])
+NECK_TYPES = np.array(["Polo Neck", "Round Neck"])
+SLEEVE_TYPES = np.array(["Long Sleeve", "Short Sleeve"])
+
+
+def predict_distinct(model, features):
+    """Predict each distinct row of a feature matrix once and scatter back to all rows."""
+    features = np.ascontiguousarray(features)
+    # Viewing each row as one opaque byte string makes np.unique a flat 1-D sort
+    row_bytes = features.view(np.dtype((np.void, features.dtype.itemsize * features.shape[1]))).ravel()
+    _, first, inverse = np.unique(row_bytes, return_index=True, return_inverse=True)
+    unique_predictions = model.predict(pd.DataFrame(features[first], columns=TRAINING_COLUMNS))
+    return np.asarray(unique_predictions, dtype=np.float32)[inverse.reshape(-1)]
+
+
+def generate_predictions(model, clean_data, days_ahead=30, chunk_rows=CHUNK_ROWS, start_date=None):
+    """Forecast daily predicted reviews for every catalog product over days_ahead days.
+
+    The catalog is processed in chunks of chunk_rows so peak memory stays
+    bounded. Returns a dict with the forecast dates, each product's
+    product_index, its daily prediction and the total over the horizon. The
+    dates start at start_date (today by default).
+    """
+    start_date = start_date or datetime.date.today()
+    dates = [start_date + datetime.timedelta(days=i) for i in range(days_ahead)]
+    daily = np.empty(len(clean_data), dtype=np.float32)
+    for start in range(0, len(clean_data), chunk_rows):
+        chunk = clean_data[TRAINING_COLUMNS].iloc[start:start + chunk_rows].to_numpy(dtype=np.float32)
+        daily[start:start + len(chunk)] = predict_distinct(model, chunk)
+
+    if "product_index" in clean_data.columns:
+        product_index = clean_data["product_index"].to_numpy()
+    else:
+        product_index = np.arange(len(clean_data))
+
+    return {
+        "dates": dates,
+        "product_index": product_index,
+        "daily_predicted_reviews": daily,
+        "total_predicted_reviews": daily.astype(np.float64) * days_ahead,
+    }
+
+
+def feature_combination_codes(clean_data):
+    """Encode each product's material/neck/sleeve combination as an integer 0-7."""
+    return (
+        (clean_data['Cotton'].to_numpy() == 1).astype(np.int64) * 4
+        + (clean_data['Round Neck'].to_numpy() == 1).astype(np.int64) * 2
+        + (clean_data['Short Sleeve'].to_numpy() == 1).astype(np.int64)
+    )
+
+
+def feature_demand_by_date(clean_data, forecast):
+    """Summed predicted reviews per date and material/neck/sleeve combination."""
+    codes = feature_combination_codes(clean_data)
+    daily = forecast["daily_predicted_reviews"]
+    combo_demand = np.bincount(codes, weights=daily, minlength=8)
+    present = np.flatnonzero(np.bincount(codes, minlength=8))
+
+    # Broadcast the per-combination totals across the horizon (dates x combinations)
+    n_dates = len(forecast["dates"])
+    combo_codes = np.tile(present, n_dates)
+    return pd.DataFrame({
+        "date": np.repeat(np.array(forecast["dates"], dtype=object), len(present)),
+        "material": MATERIALS[combo_codes >> 2],
+        "neck_type": NECK_TYPES[(combo_codes >> 1) & 1],
+        "sleeve_type": SLEEVE_TYPES[combo_codes & 1],
+        "predicted_reviews": combo_demand[combo_codes],
+    })
+
+
+def top_trending(forecast, n=5):
+    """Positions (into the forecast arrays) of the n products with the highest total prediction."""
+    totals = forecast["total_predicted_reviews"]
+    n = min(n, len(totals))
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-totals, n - 1)[:n]
+    return candidates[np.argsort(-totals[candidates], kind="stable")]
@@ -0,0 +1,108 @@
+"""Cold-start report: import time of the dashboard and its first reruns.
+
+Imports a module in a fresh interpreter under ``python -X importtime``, then
+prints the total and the top-level packages that cost the most. With
+--traces it also summarizes the cold-start reruns recorded in the trace
+file: the first rerun of each server process, which pays for the script's
+imports and is the first meaningful paint.
+
+    python import_report.py                          # import comp
+    python import_report.py batch scoring_service --top 5
+    python import_report.py --budget-ms 1500         # exit 1 if comp imports slower
+    python import_report.py --traces
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from tracing import TRACE_PATH
+
+
+def measure_imports(module, python=sys.executable):
+    """(total_ms, {top-level package: cumulative_ms}) for importing module in a new interpreter."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    # Lines read "import time: self [us] | cumulative | imported package", two
+    # more spaces of indentation per nesting level, children before their parent
+    children = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            children[name.split(".")[0]] += int(cumulative) / 1000
+        elif depth == 0:
+            if name == module:
+                return int(cumulative) / 1000, dict(children)
+            children = defaultdict(float)
+    raise RuntimeError(f"no importtime entry for {module}")
+
+
+def print_imports(module, top):
+    total_ms, packages = measure_imports(module)
+    print(f"import {module}: {total_ms:.0f} ms")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+    return total_ms
+
+
+def cold_start_summary(path=TRACE_PATH):
+    """Import and total time of each process's first rerun in the trace file."""
+    firsts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("process_sequence") == 1 and record.get("name") == "rerun":
+                firsts.append(record)
+    if not firsts:
+        return None
+    durations = np.array([record["duration_ms"] for record in firsts])
+    imports = np.array([record.get("imports_ms", np.nan) for record in firsts], dtype=float)
+    return {
+        "processes": len(firsts),
+        "first_rerun_ms": {"p50": float(np.median(durations)), "max": float(durations.max())},
+        "imports_ms": {"p50": float(np.nanmedian(imports)), "max": float(np.nanmax(imports))},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import and cold-start times.")
+    parser.add_argument("modules", nargs="*", default=["comp"])
+    parser.add_argument("--top", type=int, default=10, help="packages listed per module")
+    parser.add_argument("--budget-ms", type=float, help="exit with status 1 if any import takes longer")
+    parser.add_argument("--traces", action="store_true", help="also summarize cold-start reruns from the trace file")
+    args = parser.parse_args(argv)
+
+    over_budget = False
+    for module in args.modules:
+        total_ms = print_imports(module, args.top)
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            print(f"  over the {args.budget_ms:.0f} ms budget")
+            over_budget = True
+
+    if args.traces:
+        summary = cold_start_summary() if os.path.exists(TRACE_PATH) else None
+        if summary is None:
+            print(f"no cold-start reruns in {TRACE_PATH}")
+        else:
+            print(f"cold-start reruns over {summary['processes']} processes: "
+                  f"first rerun p50 {summary['first_rerun_ms']['p50']:.0f} ms "
+                  f"(max {summary['first_rerun_ms']['max']:.0f} ms), "
+                  f"imports p50 {summary['imports_ms']['p50']:.0f} ms")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
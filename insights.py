@@ -0,0 +1,147 @@
+"""Per-product analytics behind the dashboard views, free of Streamlit calls.
+
+comp.py wraps these in its caches and renders the results; batch.py runs the
+same functions headless over a file of candidate products.
+"""
+import pandas as pd
+
+from catalog_store import FEATURE_COLUMNS
+from tracing import span
+
+
+def make_user_product(price, material, neck_type, sleeve_type, review_growth_rate=0):
+    """One-row product frame in the layout the sidebar inputs produce."""
+    return pd.DataFrame({
+        'price': [price],
+        'review_growth_rate': [review_growth_rate],
+        'Cotton': [1 if material == "Cotton" else 0],
+        'Polyester': [1 if material == "Polyester" else 0],
+        'Round Neck': [1 if neck_type == "Round Neck" else 0],
+        'Polo Neck': [1 if neck_type == "Polo Neck" else 0],
+        'Short Sleeve': [1 if sleeve_type == "Short Sleeve" else 0],
+        'Long Sleeve': [1 if sleeve_type == "Long Sleeve" else 0]
+    })
+
+
+def calculate_similarity(user_product, products_df):
+    """Calculate similarity between user product and existing products"""
+    from sklearn.metrics.pairwise import cosine_similarity
+    from sklearn.preprocessing import StandardScaler
+
+    features = ['price', 'Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+    scaler = StandardScaler()
+    
+    # Convert user_product to DataFrame if it's not already
+    if not isinstance(user_product, pd.DataFrame):
+        user_product = pd.DataFrame(user_product, columns=features)
+    
+    with span("calculate_similarity", rows=len(products_df)):
+        products_features = scaler.fit_transform(products_df[features])
+        user_features = scaler.transform(user_product[features])
+
+        similarities = cosine_similarity(user_features, products_features)
+    return similarities[0]
+
+
+def similar_products(clean_data, catalog, index, user_product, top_n=5, review_stats=None):
+    """Return detailed information for the catalog products most similar to user_product.
+
+    review_stats (a ReviewStore's stats frame) adds each product's windowed
+    review growth and rating trend under "review_trends".
+    """
+    with span("similarity.top_k", top_n=top_n):
+        similar_indices, scores = index.top_k(user_product, top_n)
+    # Text columns are read from disk for just these products
+    with span("catalog.details", rows=len(similar_indices)):
+        details = catalog.details(similar_indices)
+
+    # Get detailed product information
+    similar_products_detailed = []
+    for idx, score in zip(similar_indices, scores):
+        clean_product = clean_data.iloc[idx]
+        full_product = details.loc[idx]
+
+        product_info = {
+            "product_id": int(catalog.product_ids[idx]),
+            "title": full_product['title'],
+            "price": clean_product['price'],
+            "rating": clean_product['rating'],
+            "reviews": clean_product['reviews'],
+            "product_link": full_product['product_link'],
+            "source": full_product['source'],
+            "product_details": full_product['product_details'],
+            "additional_features": full_product['additional_features'],
+            "features": {
+                "material": "Cotton" if clean_product['Cotton'] else "Polyester",
+                "neck_type": "Round Neck" if clean_product['Round Neck'] else "Polo Neck",
+                "sleeve_type": "Short Sleeve" if clean_product['Short Sleeve'] else "Long Sleeve"
+            },
+            "similarity_score": score
+        }
+        if review_stats is not None:
+            product_info["review_trends"] = {
+                column: float(value) for column, value in review_stats.loc[idx].items()
+            }
+        similar_products_detailed.append(product_info)
+    return similar_products_detailed
+
+
+def product_insights(cube, user_product):
+    """Price range, feature and segment analysis behind the Product Insights view."""
+    features = FEATURE_COLUMNS
+
+    # Create price ranges and analyze performance
+    price_analysis = cube.segment_performance(['rating', 'reviews', 'review_growth_rate'], labels=False)
+
+    # Mean metrics of products with each feature (0 where no product has it)
+    feature_performance = cube.feature_performance()
+
+    # Calculate optimal price range
+    user_price = user_product['price'].values[0]
+    user_segment = cube.segment_of(user_price)
+
+    segment_performance = cube.segment_performance(['rating', 'reviews', 'review_growth_rate'])
+
+    # Feature recommendations based on the matching price quintile band
+    band = cube.band_of(user_price)
+    best_features = cube.band_features(band)
+
+    # Add competitiveness score
+    user_features = set([
+        col for col in features
+        if user_product[col].values[0] == 1
+    ])
+
+    top_features = set(
+        best_features.nlargest(3, 'success_rate')['feature'].values
+    )
+
+    competitiveness_score = len(user_features.intersection(top_features)) / 3 * 100
+
+    # Price optimization recommendations
+    optimal_price_range = cube.band_optimal_price_range(band)
+
+    # Calculate demand score based on feature popularity and review growth
+    demand_factors = {
+        'feature_alignment': competitiveness_score / 100,
+        'price_optimization': float(1 - abs(user_price - optimal_price_range['mean']) / optimal_price_range['mean']),
+        'market_growth': float(cube.band_mean(band, 'review_growth_rate'))
+    }
+
+    demand_score = (
+        demand_factors['feature_alignment'] * 0.4 +
+        demand_factors['price_optimization'] * 0.3 +
+        demand_factors['market_growth'] * 0.3
+    ) * 100
+
+    return {
+        "price_analysis": price_analysis,
+        "feature_performance": feature_performance,
+        "user_segment": user_segment,
+        "segment_performance": segment_performance,
+        "best_features": best_features,
+        "competitiveness_score": competitiveness_score,
+        "optimal_price_range": optimal_price_range,
+        "demand_factors": demand_factors,
+        "demand_score": demand_score,
+    }
@@ -0,0 +1,86 @@
+"""Groq chat calls shared by the dashboard and the headless tools.
+
+Streams completions for the messages built in prompts.py through the on-disk
+response cache. Nothing here imports Streamlit, so the batch runner can
+request the same narratives as the UI.
+"""
+import threading
+import time
+
+import numpy as np
+
+from llm_cache import make_cache_key
+from tracing import span
+
+LLM_MODEL = "mixtral-8x7b-32768"
+LLM_TEMPERATURE = 0.5
+
+
+def convert_numpy_types(obj):
+    """Recursively convert numpy types to Python native types"""
+    if isinstance(obj, dict):
+        return {k: convert_numpy_types(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy_types(item) for item in obj]
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return obj
+
+
+class LazyGroqClient:
+    """Groq client that imports the groq package and connects on first use, not on creation."""
+
+    def __init__(self, api_key):
+        # api_key may be a callable, so a missing secret only fails the first real LLM call
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def chat(self):
+        with self._lock:
+            if self._client is None:
+                from groq import Groq
+
+                api_key = self._api_key() if callable(self._api_key) else self._api_key
+                self._client = Groq(api_key=api_key)
+        return self._client.chat
+
+
+def stream_chat_completion(messages, cache, client, model=LLM_MODEL, temperature=LLM_TEMPERATURE):
+    """Yield the Groq completion for messages chunk by chunk, serving cache hits in one piece."""
+    with span("llm.chat_completion", model=model) as record:
+        key = make_cache_key(model, temperature, messages)
+        content = cache.get(key)
+        if content is not None:
+            record["cache"] = "hit"
+            yield content
+            return
+
+        record["cache"] = "miss"
+        start = time.perf_counter()
+        chunks = []
+        response = client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in response:
+            # Groq reports token usage on the final streamed chunk
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage is not None:
+                record["prompt_tokens"] = usage.prompt_tokens
+                record["completion_tokens"] = usage.completion_tokens
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if not chunks:
+                    record["first_token_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                chunks.append(delta)
+                yield delta
+        record["chunks"] = len(chunks)
+        cache.set(key, "".join(chunks))
@@ -0,0 +1,98 @@
+"""Disk-backed cache for LLM responses, shared across sessions and restarts."""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite3"))
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 500
+
+
+def make_cache_key(model, temperature, payload):
+    """Hash the model, temperature and prompt payload into a stable cache key."""
+    blob = json.dumps(
+        {"model": model, "temperature": temperature, "payload": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store with TTL expiry, LRU eviction and hit/miss counters."""
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the cache safe to use from
+        # Streamlit's script threads and from several server processes at once.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached response for key, or None if it is missing or expired."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+            return row[0]
+
+    def set(self, key, value):
+        """Store a response and evict expired and least recently used entries."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries."""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries}
+
+    def clear(self):
+        """Drop all cached responses and reset the counters."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("UPDATE counters SET value = 0")
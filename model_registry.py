@@ -0,0 +1,298 @@
+"""Versioned storage for the demand model.
+
+Each model version lives in its own directory with the booster in XGBoost's
+native UBJSON format and a manifest recording what it was trained on:
+
+    .cache/models/<version>/model.ubj
+    .cache/models/<version>/manifest.json
+    .cache/models/CURRENT              (name of the version being served)
+    .cache/models/tuning.json          (best cross-validated parameters, from tune.py)
+
+The manifest holds a fingerprint of the training rows, a hash of the feature
+schema, the held-out rows and the evaluation metrics, so loading a model
+never needs to re-split or re-score the data, and a model trained on
+different data or features is detected by comparing hashes. In-memory
+training lists the held-out row positions; out-of-core training stores a
+``holdout`` rule on product IDs instead, so the manifest stays the same size
+however large the catalog grows.
+
+xgboost, scikit-learn and joblib are imported inside the functions that use
+them, so importing the registry (as the dashboard does on every cold start)
+costs only the hashing helpers.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import temp_path
+from forecasting import TRAINING_COLUMNS
+
+TARGET_COLUMN = 'reviews'
+REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", os.path.join(".cache", "models"))
+LEGACY_MODEL_PATH = "xgboost_demand_model.joblib"
+DEFAULT_PARAMS = {"n_estimators": 100, "learning_rate": 0.1, "max_depth": 5, "random_state": 42}
+# Boosting rounds added per incremental update
+INCREMENTAL_ROUNDS = 20
+TUNING_FILE = "tuning.json"
+# Rows whose product_id % modulus == remainder are held out (about 20%)
+HOLDOUT_RULE = {"column": "product_id", "modulus": 5, "remainder": 0}
+
+
+def row_hashes(data, columns=TRAINING_COLUMNS, target_column=TARGET_COLUMN):
+    """Stable per-row hash of the training columns and target."""
+    frame = data[list(columns) + [target_column]].astype('float64')
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def dataset_fingerprint(data, columns=TRAINING_COLUMNS, target_column=TARGET_COLUMN, n_rows=None):
+    """Hash of the training rows (optionally only the first n_rows) in order."""
+    hashes = row_hashes(data, columns, target_column)
+    if n_rows is not None:
+        hashes = hashes[:n_rows]
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+def schema_hash(columns=TRAINING_COLUMNS, target_column=TARGET_COLUMN):
+    """Hash of the ordered feature columns and the target name."""
+    schema = json.dumps({"features": list(columns), "target": target_column})
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()
+
+
+def _version_dir(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, version)
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """Name of the version being served, or None if the registry is empty."""
+    try:
+        with open(os.path.join(registry_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def set_current_version(version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at version with an atomic rename."""
+    tmp_path = temp_path(os.path.join(registry_dir, "CURRENT"))
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(registry_dir, "CURRENT"))
+
+
+def holdout_mask(values, rule=HOLDOUT_RULE):
+    """True for the rows of a holdout rule's column that the rule holds out."""
+    return np.asarray(values) % np.uint64(rule["modulus"]) == np.uint64(rule["remainder"])
+
+
+def test_positions(manifest, data):
+    """Held-out row positions of data: listed in the manifest or derived from its holdout rule."""
+    rule = manifest.get("holdout")
+    if rule is not None:
+        return np.flatnonzero(holdout_mask(data[rule["column"]].to_numpy(), rule))
+    positions = np.asarray(manifest["test_indices"], dtype=np.int64)
+    # A stale manifest may list rows past the end of a catalog that has since shrunk
+    return positions[positions < len(data)]
+
+
+def read_manifest(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(_version_dir(version, registry_dir), "manifest.json")) as f:
+        return json.load(f)
+
+
+def load_model(version, registry_dir=REGISTRY_DIR):
+    """Load a registered model and its manifest."""
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor()
+    model.load_model(os.path.join(_version_dir(version, registry_dir), "model.ubj"))
+    return model, read_manifest(version, registry_dir)
+
+
+def evaluate(model, X_test, y_test):
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    y_pred = model.predict(X_test)
+    return {"mse": float(mean_squared_error(y_test, y_pred)), "r2": float(r2_score(y_test, y_pred))}
+
+
+def save_model(model, data, test_indices, params, registry_dir=REGISTRY_DIR, make_current=True, holdout=None,
+               **extra):
+    """Write a new model version (booster + manifest) and optionally make it current.
+
+    With a holdout rule, the manifest records the rule instead of the
+    test_indices it selects.
+    """
+    test_indices = np.asarray(test_indices, dtype=np.int64)
+    X_test = data[TRAINING_COLUMNS].iloc[test_indices]
+    y_test = data[TARGET_COLUMN].iloc[test_indices]
+    split = {"holdout": holdout} if holdout is not None else {"test_indices": test_indices.tolist()}
+    return register_model(
+        model, dataset_fingerprint(data), len(data), split, params,
+        evaluate(model, X_test, y_test), registry_dir, make_current, **extra,
+    )
+
+
+def register_model(model, fingerprint, n_rows, split, params, metrics,
+                   registry_dir=REGISTRY_DIR, make_current=True, **extra):
+    """Write a model version whose fingerprint, held-out split and metrics were computed by the caller.
+
+    split is {"test_indices": [...]} or {"holdout": rule}.
+    """
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{fingerprint[:8]}-{uuid.uuid4().hex[:4]}"
+    version_dir = _version_dir(version, registry_dir)
+    tmp_dir = version_dir + ".tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "dataset_fingerprint": fingerprint,
+        "n_rows": n_rows,
+        "schema_hash": schema_hash(),
+        "training_columns": TRAINING_COLUMNS,
+        "target_column": TARGET_COLUMN,
+        "params": params,
+        **split,
+        "metrics": metrics,
+        **extra,
+    }
+    model.save_model(os.path.join(tmp_dir, "model.ubj"))
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_dir, version_dir)
+    if make_current:
+        set_current_version(version, registry_dir)
+    return version, manifest
+
+
+def tuned_params(registry_dir=REGISTRY_DIR):
+    """Best parameters found by tune.py for this registry, or None if it was never tuned."""
+    try:
+        with open(os.path.join(registry_dir, TUNING_FILE)) as f:
+            return json.load(f)["params"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def train_model(data, params=None, registry_dir=REGISTRY_DIR, **extra):
+    """Train on an 80/20 split, register the result and make it current.
+
+    Without explicit params the registry's tuned parameters are used, falling
+    back to DEFAULT_PARAMS.
+    """
+    from sklearn.model_selection import train_test_split
+    from xgboost import XGBRegressor
+
+    if params is None:
+        params = tuned_params(registry_dir) or DEFAULT_PARAMS
+    positions = np.arange(len(data))
+    train_idx, test_idx = train_test_split(positions, test_size=0.2, random_state=42)
+    model = XGBRegressor(**params)
+    model.fit(data[TRAINING_COLUMNS].iloc[train_idx], data[TARGET_COLUMN].iloc[train_idx])
+    return save_model(model, data, test_idx, params, registry_dir, **extra)
+
+
+def _adopt_legacy_model(data, registry_dir):
+    # The model that used to be loaded from the repo root becomes the first
+    # registered version, with the same split it was always evaluated on
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    positions = np.arange(len(data))
+    _, test_idx = train_test_split(positions, test_size=0.2, random_state=42)
+    model = joblib.load(LEGACY_MODEL_PATH)
+    return save_model(model, data, test_idx, DEFAULT_PARAMS, registry_dir, source=LEGACY_MODEL_PATH)
+
+
+def is_stale(manifest, data):
+    """True if manifest was trained on different rows or features than data provides."""
+    return (
+        manifest.get("schema_hash") != schema_hash()
+        or manifest.get("dataset_fingerprint") != dataset_fingerprint(data)
+    )
+
+
+def appended_rows(manifest, data):
+    """Number of rows appended since manifest was trained, or None if earlier rows changed."""
+    n_old = manifest.get("n_rows", 0)
+    if manifest.get("schema_hash") != schema_hash() or len(data) < n_old:
+        return None
+    if dataset_fingerprint(data, n_rows=n_old) != manifest.get("dataset_fingerprint"):
+        return None
+    return len(data) - n_old
+
+
+def update_model(data, registry_dir=REGISTRY_DIR, rounds=INCREMENTAL_ROUNDS):
+    """Bring the registry up to date with data and return the serving (version, manifest).
+
+    If rows were only appended since the current version was trained, boosting
+    continues from the existing booster on the new rows alone, so the cost
+    scales with the delta. Any other change (edited or removed rows, new
+    features, empty registry) falls back to a full retrain.
+    """
+    from sklearn.model_selection import train_test_split
+    from xgboost import XGBRegressor
+
+    version = current_version(registry_dir)
+    if version is None:
+        return train_model(data, registry_dir=registry_dir)
+    model, manifest = load_model(version, registry_dir)
+    delta = appended_rows(manifest, data)
+    if delta == 0:
+        return version, manifest
+    if delta is None:
+        return train_model(data, registry_dir=registry_dir)
+
+    # Hold out 20% of the new rows alongside the existing held-out rows
+    new_positions = np.arange(manifest["n_rows"], len(data))
+    holdout = manifest.get("holdout")
+    if holdout is not None:
+        # Versions holding out by rule keep applying it, so new rows follow the same split
+        test_idx = test_positions(manifest, data)
+        train_idx = new_positions[~holdout_mask(data[holdout["column"]].to_numpy()[new_positions], holdout)]
+    else:
+        if delta >= 5:
+            train_idx, new_test_idx = train_test_split(new_positions, test_size=0.2, random_state=42)
+        else:
+            train_idx, new_test_idx = new_positions, np.empty(0, dtype=np.int64)
+        test_idx = np.concatenate([np.asarray(manifest["test_indices"], dtype=np.int64), new_test_idx])
+
+    updated = model
+    if len(train_idx):
+        params = dict(manifest["params"], n_estimators=rounds)
+        updated = XGBRegressor(**params)
+        updated.fit(
+            data[TRAINING_COLUMNS].iloc[train_idx],
+            data[TARGET_COLUMN].iloc[train_idx],
+            xgb_model=model.get_booster(),
+        )
+    return save_model(
+        updated, data, test_idx, manifest["params"], registry_dir, holdout=holdout,
+        parent_version=version, appended_rows=int(delta), mode="incremental",
+        num_trees=updated.get_booster().num_boosted_rounds(),
+    )
+
+
+def load_or_train(data, registry_dir=REGISTRY_DIR, retrain_stale=True):
+    """Return (model, manifest) for data, training a new version only if the current one is stale.
+
+    With retrain_stale=False a stale current version is still returned, with
+    "stale": True in its manifest, so request handlers can leave the refresh
+    to a background job instead of training inline.
+    """
+    version = current_version(registry_dir)
+    if version is None and os.path.exists(LEGACY_MODEL_PATH):
+        version, _ = _adopt_legacy_model(data, registry_dir)
+    if version is not None:
+        model, manifest = load_model(version, registry_dir)
+        if not is_stale(manifest, data):
+            return model, manifest
+        if not retrain_stale:
+            return model, dict(manifest, stale=True)
+    version, manifest = train_model(data, registry_dir=registry_dir)
+    return load_model(version, registry_dir)
@@ -0,0 +1,227 @@
+"""Compact, token-budgeted prompts for the Groq analysis calls.
+
+Both prompts send their data as one minified JSON payload: prices in whole
+rupees, other numbers (ratings, ratios, similarities, averages) rounded to a
+few significant digits, one-hot feature columns folded back into
+material/neck/sleeve values, competitors as a column list plus rows (so keys
+are not repeated per product), duplicate listings dropped, and links left
+out. If the estimated prompt size exceeds the token budget, free-text fields
+are truncated in fixed steps and then the least similar competitors are
+dropped, always in the same order. The output depends only on the inputs and
+the budget, so identical inputs give byte-identical prompts (and LLM cache
+hits).
+"""
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "1000"))
+SIGNIFICANT_DIGITS = 3
+# Characters of product_details/additional_features kept, tried in order until the prompt fits
+DETAIL_CHAR_STEPS = (160, 80, 0)
+COMPETITOR_COLUMNS = [
+    "title", "price", "rating", "reviews", "source", "material", "neck", "sleeve", "similarity",
+    "details", "extra",
+]
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+EMPTY_ITEMS_PATTERN = re.compile(r"(?:\s*,)+")
+
+MARKET_SYSTEM = "You are a market analysis expert specializing in e-commerce and apparel."
+MARKET_INSTRUCTIONS = """Apparel market summary (JSON; prices in INR):
+{payload}
+
+Analyze:
+1. Market positioning and pricing strategy: price points, competition intensity
+2. Consumer preferences by feature: successful combinations, underserved segments
+3. Engagement trends from reviews: high-growth segments, market gaps
+4. Recommendations for new entrants: pricing, features, positioning
+
+Use clear sections with bullet points. Be specific, cite the numbers and use ₹ (INR)."""
+
+COMPETITIVE_SYSTEM = "You are a product strategy expert specializing in competitive analysis."
+COMPETITIVE_INSTRUCTIONS = """User product and its most similar competitors (JSON; prices in INR; competitors as columns + rows, similarity 0-1):
+{payload}
+
+Provide a competitive analysis:
+1. Price positioning versus competitors and the optimal price point
+2. Features common to successful competitors, and features that could differentiate the user's product
+3. Ratings and reviews versus competitors, and what drives higher ratings here
+4. Clear, actionable recommendations and areas for differentiation
+
+Use clear sections, be data-driven, use ₹ (INR) and address the client directly."""
+
+
+def estimate_tokens(text):
+    """Approximate token count: one per word or punctuation character."""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def round_numbers(obj, digits=SIGNIFICANT_DIGITS):
+    """Recursively round floats to significant digits and convert numpy scalars to Python types."""
+    if isinstance(obj, dict):
+        return {k: round_numbers(v, digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [round_numbers(item, digits) for item in obj]
+    if isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        value = float(obj)
+        if not math.isfinite(value):
+            return None
+        if value == 0:
+            return 0
+        rounded = round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+        return int(rounded) if rounded == int(rounded) else rounded
+    return obj
+
+
+def rupees(value):
+    """A price as whole rupees (None if missing), so significant-digit rounding never moves it."""
+    if value is None:
+        return None
+    value = float(value)
+    return int(round(value)) if math.isfinite(value) else None
+
+
+def truncate(text, limit):
+    """text cut to at most limit characters at a word boundary, with an ellipsis if anything was cut."""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return ""
+    # Collapse whitespace and the empty ", , ," runs the scraper leaves behind
+    text = EMPTY_ITEMS_PATTERN.sub(",", " ".join(str(text).split())).strip(" ,")
+    if len(text) <= limit:
+        return text
+    if limit <= 0:
+        return ""
+    cut = text[:limit].rsplit(" ", 1)[0] if " " in text[:limit] else text[:limit]
+    return cut.rstrip(" ,;·") + "…"
+
+
+def compact_json(obj):
+    return json.dumps(round_numbers(obj), ensure_ascii=False, separators=(",", ":"))
+
+
+def _features(row):
+    return {
+        "material": "Cotton" if row.get("Cotton") else "Polyester" if row.get("Polyester") else None,
+        "neck": "Round Neck" if row.get("Round Neck") else "Polo Neck" if row.get("Polo Neck") else None,
+        "sleeve": "Short Sleeve" if row.get("Short Sleeve") else "Long Sleeve" if row.get("Long Sleeve") else None,
+    }
+
+
+def _product_row(user_product):
+    # A one-row frame, its to_dict() ({column: {0: value}}) or a flat dict
+    if hasattr(user_product, "iloc"):
+        return user_product.iloc[0].to_dict()
+    return {k: next(iter(v.values())) if isinstance(v, dict) else v for k, v in user_product.items()}
+
+
+def market_payload(data):
+    """Rounded catalog summary behind the market insights prompt."""
+    price = data['price']
+    return {
+        "products": len(data),
+        "price": {
+            "mean": rupees(price.mean()),
+            "median": rupees(price.median()),
+            "min": rupees(price.min()),
+            "max": rupees(price.max()),
+        },
+        "avg_rating": data['rating'].mean(),
+        "feature_counts": {
+            feature: data[feature].sum()
+            for feature in ['Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+        },
+        "reviews": {
+            "mean": data['reviews'].mean(),
+            "max": data['reviews'].max(),
+            "avg_growth": data['review_growth_rate'].mean(),
+        },
+    }
+
+
+def competitive_payload(similar_products_data, user_product, detail_chars=DETAIL_CHAR_STEPS[0], max_competitors=None):
+    """User product plus a de-duplicated competitor table with free text cut to detail_chars."""
+    row = _product_row(user_product)
+    user = {"price": rupees(row.get("price")), **_features(row)}
+    if row.get("review_growth_rate"):
+        user["review_growth_rate"] = row["review_growth_rate"]
+
+    rows, seen = [], set()
+    # Most similar first, so the budget drops the least similar
+    for product in sorted(similar_products_data, key=lambda p: -(p.get("similarity_score") or 0)):
+        features = product.get("features", {})
+        values = [
+            truncate(product.get("title"), 120),
+            rupees(product.get("price")),
+            product.get("rating"),
+            product.get("reviews"),
+            product.get("source"),
+            features.get("material"),
+            features.get("neck_type"),
+            features.get("sleeve_type"),
+            product.get("similarity_score"),
+            truncate(product.get("product_details"), detail_chars),
+            truncate(product.get("additional_features"), detail_chars),
+        ]
+        # The same listing scraped twice only needs to be described once
+        identity = (values[0], values[1], values[4])
+        if identity in seen:
+            continue
+        seen.add(identity)
+        rows.append(values)
+    if max_competitors is not None:
+        rows = rows[:max_competitors]
+
+    # Columns no competitor has a value for are dropped
+    keep = [i for i in range(len(COMPETITOR_COLUMNS)) if any(r[i] not in (None, "") for r in rows)]
+    return {
+        "user_product": user,
+        "competitors": {
+            "columns": [COMPETITOR_COLUMNS[i] for i in keep],
+            "rows": [[r[i] for i in keep] for r in rows],
+        },
+    }
+
+
+def build_messages(system, instructions, payload):
+    """System and user chat messages with the compact payload filled into the instructions."""
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": instructions.format(payload=compact_json(payload))},
+    ]
+
+
+def message_tokens(messages):
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def market_insights_messages(data):
+    """Chat messages asking for market insights on the catalog summary."""
+    # The summary has a fixed size (about 300 tokens), so it needs no budget
+    return build_messages(MARKET_SYSTEM, MARKET_INSTRUCTIONS, market_payload(data))
+
+
+def competitive_analysis_messages(similar_products_data, user_product, budget=PROMPT_TOKEN_BUDGET):
+    """Chat messages comparing user_product with similar products, shrunk to fit budget tokens."""
+    for detail_chars in DETAIL_CHAR_STEPS:
+        messages = build_messages(
+            COMPETITIVE_SYSTEM, COMPETITIVE_INSTRUCTIONS,
+            competitive_payload(similar_products_data, user_product, detail_chars),
+        )
+        if message_tokens(messages) <= budget:
+            return messages
+    # Still over budget without free text: drop the least similar competitors
+    for max_competitors in range(len(similar_products_data) - 1, 0, -1):
+        messages = build_messages(
+            COMPETITIVE_SYSTEM, COMPETITIVE_INSTRUCTIONS,
+            competitive_payload(similar_products_data, user_product, 0, max_competitors),
+        )
+        if message_tokens(messages) <= budget:
+            return messages
+    return messages
@@ -0,0 +1,112 @@
+"""Background refresh of the demand model.
+
+Runs outside the Streamlit request path: picks up rows appended to the
+catalog, continues boosting from the current model on just those rows (or
+retrains from scratch if earlier rows changed) and atomically switches the
+registry's CURRENT pointer to the new version. Dashboard sessions pick up the
+new version on their next rerun.
+
+    python retrain.py                 # one update, then exit
+    python retrain.py --watch 300     # check every 300 seconds
+    python retrain.py --external      # full retrain streamed from disk, for catalogs larger than RAM
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from catalog_store import load_catalog
+from model_registry import REGISTRY_DIR, update_model
+
+LOCK_NAME = "retrain.lock"
+# A lock older than this is assumed to belong to a crashed job
+LOCK_TIMEOUT_SECONDS = 3600
+
+
+def _lock_path(registry_dir):
+    return os.path.join(registry_dir, LOCK_NAME)
+
+
+def acquire_lock(registry_dir=REGISTRY_DIR):
+    """Create the retrain lock file; return False if another job holds it."""
+    os.makedirs(registry_dir, exist_ok=True)
+    path = _lock_path(registry_dir)
+    try:
+        if time.time() - os.path.getmtime(path) > LOCK_TIMEOUT_SECONDS:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def release_lock(registry_dir=REGISTRY_DIR):
+    try:
+        os.remove(_lock_path(registry_dir))
+    except OSError:
+        pass
+
+
+def run_once(registry_dir=REGISTRY_DIR, external=False, batch_rows=None):
+    """Update the registry from the current catalog; return the serving version or None if locked.
+
+    With external=True the model is retrained from scratch out of core
+    (external_training), without ever loading the catalog into memory.
+    """
+    if not acquire_lock(registry_dir):
+        return None
+    try:
+        if external:
+            from external_training import BATCH_ROWS, train_external
+
+            version, manifest = train_external(registry_dir=registry_dir, batch_rows=batch_rows or BATCH_ROWS)
+            return version
+        clean_data, _ = load_catalog(details_columns=[])
+        version, manifest = update_model(clean_data, registry_dir)
+        return version
+    finally:
+        release_lock(registry_dir)
+
+
+def start_background_retrain(registry_dir=REGISTRY_DIR):
+    """Launch a detached one-shot retrain unless one is already running."""
+    if os.path.exists(_lock_path(registry_dir)):
+        return False
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--registry-dir", registry_dir],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally refresh the demand model.")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep running and check for new rows every SECONDS")
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    parser.add_argument("--external", action="store_true",
+                        help="retrain from scratch, streaming the catalog from disk in batches")
+    parser.add_argument("--batch-rows", type=int, help="rows per batch with --external")
+    args = parser.parse_args(argv)
+
+    while True:
+        version = run_once(args.registry_dir, args.external, args.batch_rows)
+        if version is None:
+            print("another retrain is in progress")
+        else:
+            print(f"serving model version {version}")
+        if args.watch is None:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
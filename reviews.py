@@ -0,0 +1,242 @@
+"""Review events parsed from the scraped ``detailed_reviews`` text.
+
+Each product's ``detailed_reviews`` cell is a string such as
+``"5★ - 8 August 2024; 1★ - 17 May 2022; ..."``. The parser explodes and
+matches all cells with vectorized string operations and stores the result as
+three integer arrays (product row, stars, day number since 1970-01-01),
+grouped by product in CSR form so one product's reviews are a slice.
+
+Review growth and rating trends are computed from those arrays over
+configurable windows ending at ``as_of`` (the newest review by default):
+
+    growth_rate_<w>d   share of the product's reviews posted in the last w days
+    rating_<w>d        mean stars in the last w days
+    rating_trend_<w>d  rating_<w>d minus the mean stars before the window
+
+When detailed_reviews text changes for some products, ``ReviewStore.update``
+re-parses and re-scores only those products. The statistics are saved with
+the events, so loading a store never rescans every review.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import catalog_version, read_table, temp_path
+
+REVIEW_PATTERN = r"^\s*(?P<stars>[1-5])★\s*-\s*(?P<date>\d{1,2} [A-Za-z]+ \d{4})\s*$"
+DEFAULT_WINDOWS = (30, 90, 365)
+REVIEWS_DIR = os.environ.get("REVIEWS_DIR", os.path.join(".cache", "reviews"))
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def text_hashes(detailed_reviews):
+    """Per-product hash of the raw review text, used to detect changed products."""
+    return pd.util.hash_array(detailed_reviews.fillna("").to_numpy(dtype=object))
+
+
+def parse_reviews(detailed_reviews, product_rows=None):
+    """Parse detailed_reviews strings into (product, stars, day) int arrays.
+
+    product_rows gives the catalog row of each string (defaults to 0..n-1).
+    Entries that do not look like "<n>★ - <day> <Month> <year>" (for example
+    "No reviews found") are skipped.
+    """
+    if product_rows is None:
+        product_rows = np.arange(len(detailed_reviews))
+    entries = pd.Series(detailed_reviews.to_numpy(dtype=object), index=product_rows).str.split(";").explode()
+    matched = entries.str.extract(REVIEW_PATTERN).dropna()
+    days = pd.to_datetime(matched["date"], format="%d %B %Y", errors="coerce")
+    valid = days.notna().to_numpy()
+
+    product = matched.index.to_numpy()[valid].astype(np.int32)
+    stars = matched["stars"].to_numpy()[valid].astype(np.int8)
+    day = (days.to_numpy()[valid].astype("datetime64[D]") - EPOCH).astype(np.int32)
+    return product, stars, day
+
+
+def _csr(n_products, product, stars, day):
+    # Group by product, oldest review first
+    order = np.lexsort((day, product))
+    offsets = np.zeros(n_products + 1, dtype=np.int64)
+    np.cumsum(np.bincount(product, minlength=n_products), out=offsets[1:])
+    return offsets, stars[order], day[order]
+
+
+def window_stats(offsets, stars, day, products, as_of, window_days):
+    """Growth and rating statistics of the given products over the window_days before as_of."""
+    counts = np.diff(offsets)[products]
+    owner = np.repeat(np.arange(len(products)), counts)
+    # Event positions of every selected product's slice, concatenated
+    slice_starts = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) + np.repeat(offsets[products] - slice_starts, counts)
+    event_stars = stars[positions].astype(np.float64)
+    recent = (day[positions] > as_of - window_days) & (day[positions] <= as_of)
+    earlier = day[positions] <= as_of - window_days
+
+    n = len(products)
+    recent_count = np.bincount(owner, weights=recent, minlength=n)
+    earlier_count = np.bincount(owner, weights=earlier, minlength=n)
+    recent_stars = np.bincount(owner, weights=event_stars * recent, minlength=n)
+    earlier_stars = np.bincount(owner, weights=event_stars * earlier, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(counts > 0, recent_count / counts, 0.0)
+        rating = recent_stars / recent_count
+        trend = rating - earlier_stars / earlier_count
+    return {
+        f"reviews_{window_days}d": recent_count.astype(np.int32),
+        f"growth_rate_{window_days}d": growth,
+        f"rating_{window_days}d": rating,
+        f"rating_trend_{window_days}d": trend,
+    }
+
+
+class ReviewStore:
+    """Parsed review events for every catalog product, plus windowed statistics."""
+
+    def __init__(self, hashes, offsets, stars, day, windows=DEFAULT_WINDOWS, as_of=None, stats=None):
+        self.hashes = hashes
+        # Reviews of product p are stars/day[offsets[p]:offsets[p + 1]], oldest first
+        self.offsets = offsets
+        self.stars = stars
+        self.day = day
+        self.windows = tuple(int(w) for w in windows)
+        self.fixed_as_of = as_of
+        # Statistics saved with the events are reused; otherwise every product is scored
+        self.stats = self._compute_stats(np.arange(self.n_products)) if stats is None else stats
+
+    @classmethod
+    def build(cls, detailed_reviews, windows=DEFAULT_WINDOWS, as_of=None):
+        product, stars, day = parse_reviews(detailed_reviews)
+        offsets, stars, day = _csr(len(detailed_reviews), product, stars, day)
+        return cls(text_hashes(detailed_reviews), offsets, stars, day, windows, as_of)
+
+    @property
+    def n_products(self):
+        return len(self.offsets) - 1
+
+    @property
+    def as_of(self):
+        """Day number the windows end on: the fixed as_of, or the newest review."""
+        if self.fixed_as_of is not None:
+            return int(self.fixed_as_of)
+        return int(self.day.max()) if len(self.day) else 0
+
+    def reviews_of(self, product):
+        """(stars, day) arrays of one product's reviews."""
+        lo, hi = self.offsets[product], self.offsets[product + 1]
+        return self.stars[lo:hi], self.day[lo:hi]
+
+    def _compute_stats(self, products):
+        columns = {}
+        for window in self.windows:
+            columns.update(window_stats(self.offsets, self.stars, self.day, products, self.as_of, window))
+        return pd.DataFrame(columns, index=pd.Index(products, name="product_index"))
+
+    def update(self, detailed_reviews):
+        """Re-parse products whose text changed (or that are new); return their rows.
+
+        Statistics are recomputed for just those products, unless the newest
+        review moved as_of forward, which shifts every product's windows.
+        """
+        hashes = text_hashes(detailed_reviews)
+        n_old = len(self.hashes)
+        changed = np.flatnonzero(hashes[:n_old] != self.hashes[:len(hashes)])
+        changed = np.concatenate([changed, np.arange(n_old, len(hashes))]).astype(np.int64)
+        if len(hashes) < n_old:
+            # Products were removed, so every row number after the cut is suspect
+            rebuilt = ReviewStore.build(detailed_reviews, self.windows, self.fixed_as_of)
+            self.__dict__.update(rebuilt.__dict__)
+            return np.arange(len(hashes))
+        if len(changed) == 0:
+            return changed
+
+        old_as_of = self.as_of
+        product, stars, day = parse_reviews(detailed_reviews.iloc[changed], changed)
+        keep = np.ones(len(self.stars), dtype=bool)
+        old_counts = np.diff(self.offsets)
+        owners = np.repeat(np.arange(n_old), old_counts)
+        keep[np.isin(owners, changed)] = False
+        self.offsets, self.stars, self.day = _csr(
+            len(hashes),
+            np.concatenate([owners[keep].astype(np.int32), product]),
+            np.concatenate([self.stars[keep], stars]),
+            np.concatenate([self.day[keep], day]),
+        )
+        self.hashes = hashes
+
+        if self.as_of != old_as_of:
+            self.stats = self._compute_stats(np.arange(self.n_products))
+        else:
+            updated = self._compute_stats(changed)
+            self.stats = pd.concat([self.stats.drop(index=changed, errors="ignore"), updated]).sort_index()
+        return changed
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = temp_path(path, suffix=".tmp.npz")
+        np.savez(
+            tmp_path, hashes=self.hashes, offsets=self.offsets, stars=self.stars, day=self.day,
+            windows=np.array(self.windows),
+            as_of=np.array(-1 if self.fixed_as_of is None else self.fixed_as_of),
+            stat_columns=np.array(self.stats.columns, dtype=str),
+            **{f"stat_{i}": self.stats[column].to_numpy() for i, column in enumerate(self.stats.columns)},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            as_of = int(arrays["as_of"])
+            stats = None
+            # Stores saved before the statistics were persisted have no stat_columns
+            if "stat_columns" in arrays.files:
+                columns = arrays["stat_columns"].tolist()
+                stats = pd.DataFrame(
+                    {column: arrays[f"stat_{i}"] for i, column in enumerate(columns)},
+                    index=pd.RangeIndex(len(arrays["offsets"]) - 1, name="product_index"),
+                )
+            return cls(
+                arrays["hashes"], arrays["offsets"], arrays["stars"], arrays["day"],
+                tuple(arrays["windows"].tolist()), None if as_of < 0 else as_of, stats,
+            )
+
+
+def load_or_build_reviews(version=None, windows=DEFAULT_WINDOWS, reviews_dir=REVIEWS_DIR):
+    """Review store for this catalog version: loaded, updated from the latest earlier version, or built."""
+    version = version or catalog_version()
+    path = os.path.join(reviews_dir, f"{version}.npz")
+    if os.path.exists(path):
+        store = ReviewStore.load(path)
+        if store.windows == tuple(windows):
+            return store
+
+    detailed_reviews = read_table("details", ["detailed_reviews"])["detailed_reviews"]
+    previous = sorted(
+        (os.path.join(reviews_dir, name) for name in os.listdir(reviews_dir) if name.endswith(".npz"))
+        if os.path.isdir(reviews_dir) else [],
+        key=os.path.getmtime,
+    )
+    store = None
+    if previous:
+        store = ReviewStore.load(previous[-1])
+        if store.windows != tuple(windows):
+            store = None
+        else:
+            store.update(detailed_reviews)
+    if store is None:
+        store = ReviewStore.build(detailed_reviews, windows)
+    store.save(path)
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parse detailed_reviews and print windowed review statistics.")
+    parser.add_argument("--windows", type=int, nargs="+", default=list(DEFAULT_WINDOWS), metavar="DAYS")
+    args = parser.parse_args()
+    review_store = load_or_build_reviews(windows=args.windows)
+    print(f"{len(review_store.stars)} reviews for {review_store.n_products} products, "
+          f"windows ending {EPOCH + review_store.as_of}")
+    print(review_store.stats.describe().T.to_string())
@@ -0,0 +1,280 @@
+"""Local HTTP/JSON service for similar products and predicted demand.
+
+Requests that arrive together are coalesced into micro-batches: one thread
+drains the request queue for up to ``max_wait_ms`` (or until ``max_batch``
+requests are waiting), runs a single model predict and a single batched
+similarity query for the whole batch, and hands each caller its own result.
+Everything is read from the local catalog store and model registry, so the
+service runs fully offline.
+
+    python scoring_service.py --port 8502
+
+    POST /score    {"price": 499, "material": "Cotton", "neck_type": "Round Neck",
+                    "sleeve_type": "Short Sleeve", "review_growth_rate": 0.1, "top_n": 5}
+    GET  /metrics  request latency percentiles and batch sizes
+    GET  /health
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from catalog_store import FEATURE_COLUMNS, Catalog, catalog_version, load_shared_clean
+from forecasting import TRAINING_COLUMNS, predict_distinct
+from insights import make_user_product
+from model_registry import load_or_train
+from similarity_index import SIMILARITY_FEATURES, load_or_build_index
+
+MAX_BATCH = 64
+MAX_WAIT_MS = 5
+MAX_TOP_N = 50
+# Number of recent requests/batches the metrics are computed over
+METRICS_WINDOW = 10000
+
+
+def _finite(payload, field, default=None):
+    value = float(payload.get(field, default))
+    # float() accepts "nan" and "inf", which the model would happily score
+    if not np.isfinite(value):
+        raise ValueError(f"'{field}' must be a finite number")
+    return value
+
+
+def parse_product(payload):
+    """Training-column values for a request body with sidebar-style or one-hot features."""
+    if not isinstance(payload, dict) or 'price' not in payload:
+        raise ValueError("request body must be a JSON object with a 'price'")
+    if all(column in payload for column in FEATURE_COLUMNS):
+        flags = {column: int(payload[column]) for column in FEATURE_COLUMNS}
+    else:
+        choices = {
+            'material': ["Cotton", "Polyester"],
+            'neck_type': ["Round Neck", "Polo Neck"],
+            'sleeve_type': ["Short Sleeve", "Long Sleeve"],
+        }
+        for field, allowed in choices.items():
+            if payload.get(field) not in allowed:
+                raise ValueError(f"'{field}' must be one of {allowed}")
+        flags = make_user_product(
+            0, payload['material'], payload['neck_type'], payload['sleeve_type']
+        )[FEATURE_COLUMNS].iloc[0].to_dict()
+    values = dict(flags, price=_finite(payload, 'price'), review_growth_rate=_finite(payload, 'review_growth_rate', 0))
+    return [values[column] for column in TRAINING_COLUMNS]
+
+
+class BatchMetrics:
+    """Rolling request latencies and batch sizes."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batch_sizes.append(size)
+            self.batches += 1
+
+    def record_request(self, latency_ms):
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            self.requests += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self.latencies_ms)
+            sizes = np.array(self.batch_sizes)
+            requests, batches = self.requests, self.batches
+        summary = {"requests": requests, "batches": batches}
+        if len(latencies):
+            summary["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            }
+        if len(sizes):
+            summary["batch_size"] = {
+                "mean": float(sizes.mean()),
+                "p50": float(np.percentile(sizes, 50)),
+                "max": int(sizes.max()),
+            }
+        return summary
+
+
+class MicroBatcher:
+    """Collects submitted items on a queue and scores them in batches on one worker thread."""
+
+    def __init__(self, score_batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, metrics=None):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = metrics or BatchMetrics()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue item for the next batch; returns a Future for its result."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.metrics.record_batch(len(batch))
+            try:
+                results = self.score_batch([item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class Scorer:
+    """Model and similarity index over the local catalog, scored a batch at a time."""
+
+    def __init__(self):
+        self.clean_data = load_shared_clean()
+        self.catalog = Catalog()
+        self.index = load_or_build_index(self.clean_data, catalog_version())
+        self.model, self.manifest = load_or_train(self.clean_data, retrain_stale=False)
+
+    def score_batch(self, requests):
+        """requests are (training-column values, top_n) pairs; returns one result dict per request."""
+        features = np.array([values for values, _ in requests], dtype=np.float32)
+        demand = predict_distinct(self.model, features)
+
+        similarity_values = features[:, [TRAINING_COLUMNS.index(column) for column in SIMILARITY_FEATURES]]
+        max_top_n = max(top_n for _, top_n in requests)
+        neighbours = self.index.top_k_many(similarity_values, max_top_n)
+
+        # One lazy text fetch for every product shown anywhere in the batch
+        shown = np.unique(np.concatenate([rows[:top_n] for (_, top_n), (rows, _) in zip(requests, neighbours)]))
+        details = self.catalog.details(shown, ['title', 'product_link', 'source'])
+
+        results = []
+        for (_, top_n), predicted, (rows, scores) in zip(requests, demand, neighbours):
+            results.append({
+                "predicted_demand": float(predicted),
+                "model_version": self.manifest["version"],
+                "similar_products": [self._product(row, score, details) for row, score in zip(rows[:top_n], scores[:top_n])],
+            })
+        return results
+
+    def _product(self, row, score, details):
+        clean_product = self.clean_data.iloc[row]
+        full_product = details.loc[row]
+        return {
+            "product_id": int(self.catalog.product_ids[row]),
+            "title": full_product['title'],
+            "price": float(clean_product['price']),
+            "rating": float(clean_product['rating']),
+            "reviews": int(clean_product['reviews']),
+            "source": full_product['source'],
+            "product_link": full_product['product_link'],
+            "similarity_score": float(score),
+        }
+
+
+def make_handler(batcher):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send_json(200, batcher.metrics.snapshot())
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._send_json(404, {"error": "not found"})
+                return
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+                values = parse_product(payload)
+                top_n = min(max(int(payload.get('top_n', 5)), 0), MAX_TOP_N)
+            except (ValueError, TypeError) as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            try:
+                result = batcher.submit((values, top_n)).result()
+            except Exception as exc:
+                self._send_json(500, {"error": str(exc)})
+                return
+            batcher.metrics.record_request((time.perf_counter() - start) * 1000)
+            self._send_json(200, result)
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate the cost of a scoring call
+            pass
+
+    return ScoringHandler
+
+
+class ScoringServer(ThreadingHTTPServer):
+    # Bursts of concurrent clients are the point of micro-batching; the default backlog of 5 resets them
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=8502, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    scorer = Scorer()
+    batcher = MicroBatcher(scorer.score_batch, max_batch, max_wait_ms)
+    return ScoringServer((host, port), make_handler(batcher))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve similar products and predicted demand over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"scoring service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Precomputed exact top-k cosine similarity over the product catalog.
+
+Products are compared on standardized price plus six binary feature flags.
+Within one combination of flags every product shares the same flag vector,
+so its cosine similarity to a query depends only on its standardized price
+``p``:
+
+    sim(p) = (u_p * p + k) / (|u| * sqrt(p**2 + B))
+
+where ``k`` is the dot product of the query and group flag vectors and ``B``
+the squared norm of the group flag vector. That function has at most one
+turning point, so with each group sorted by price the best products are found
+by walking outwards from the peak (k > 0) or inwards from both ends
+(k <= 0). A heap merges the groups, which makes a top-k query
+O(groups * log n + k log groups) instead of a pass over the whole catalog.
+"""
+import heapq
+import math
+import os
+
+import numpy as np
+
+from catalog_store import temp_path
+
+SIMILARITY_FEATURES = ['price', 'Cotton', 'Polyester', 'Round Neck', 'Polo Neck', 'Short Sleeve', 'Long Sleeve']
+INDEX_DIR = os.environ.get("SIMILARITY_INDEX_DIR", os.path.join(".cache", "similarity"))
+
+
+def _standard_scale(values):
+    """Column means and scales matching sklearn's StandardScaler (constant columns scale by 1)."""
+    mean = values.mean(axis=0)
+    scale = values.std(axis=0)
+    scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+    return mean, scale
+
+
+def _cosine(numerator, norm_u, norm_z):
+    # Zero-length vectors have similarity 0, as in sklearn's cosine_similarity
+    denom = norm_u * norm_z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denom > 0, numerator / np.where(denom > 0, denom, 1.0), 0.0)
+
+
+class SimilarityIndex:
+    """Fitted scaling plus flag-partitioned, price-sorted product vectors."""
+
+    def __init__(self, mean, scale, order, group_starts, group_flags, z_price):
+        self.mean = mean
+        self.scale = scale
+        # Catalog row numbers grouped by flag combination, sorted by price inside each group
+        self.order = order
+        # group g covers order[group_starts[g]:group_starts[g + 1]]
+        self.group_starts = group_starts
+        # standardized flag vector shared by every product of a group
+        self.group_flags = group_flags
+        # standardized price of order[i]
+        self.z_price = z_price
+        self.group_flag_norm2 = (group_flags ** 2).sum(axis=1)
+
+    @classmethod
+    def build(cls, products_df):
+        """Fit the scaling and partition the catalog; flags must be 0/1."""
+        values = products_df[SIMILARITY_FEATURES].to_numpy(dtype=np.float64)
+        flags = values[:, 1:]
+        if not np.isin(flags, (0.0, 1.0)).all():
+            raise ValueError("similarity index requires binary feature flags")
+
+        mean, scale = _standard_scale(values)
+        codes = flags.astype(np.int64) @ (1 << np.arange(flags.shape[1]))
+        # lexsort's last key is primary: group by code, then price, then row number
+        order = np.lexsort((np.arange(len(values)), values[:, 0], codes))
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        group_starts = np.r_[starts, len(order)]
+        group_flags = (flags[order[starts]] - mean[1:]) / scale[1:]
+        z_price = (values[order, 0] - mean[0]) / scale[0]
+        return cls(mean, scale, order, group_starts, group_flags, z_price)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = temp_path(path, suffix=".tmp.npz")
+        np.savez(
+            tmp_path, mean=self.mean, scale=self.scale, order=self.order,
+            group_starts=self.group_starts, group_flags=self.group_flags, z_price=self.z_price,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def transform(self, user_product):
+        """Standardize a product (DataFrame row, dict or sequence in SIMILARITY_FEATURES order)."""
+        if hasattr(user_product, "__getitem__") and not isinstance(user_product, (list, tuple, np.ndarray)):
+            values = [np.asarray(user_product[col], dtype=np.float64).reshape(-1)[0] for col in SIMILARITY_FEATURES]
+        else:
+            values = user_product
+        return (np.asarray(values, dtype=np.float64) - self.mean) / self.scale
+
+    def similarities(self, user_product):
+        """Cosine similarity of user_product to every catalog product, in catalog order."""
+        u = self.transform(user_product)
+        numerator = u[0] * self.z_price
+        norm2 = self.z_price ** 2
+        for g in range(len(self.group_flags)):
+            lo, hi = self.group_starts[g], self.group_starts[g + 1]
+            numerator[lo:hi] += u[1:] @ self.group_flags[g]
+            norm2[lo:hi] += self.group_flag_norm2[g]
+        result = np.empty(len(self.order))
+        result[self.order] = _cosine(numerator, np.sqrt(u @ u), np.sqrt(norm2))
+        return result
+
+    def transform_many(self, values):
+        """Standardize an (n, len(SIMILARITY_FEATURES)) array of products."""
+        return (np.asarray(values, dtype=np.float64) - self.mean) / self.scale
+
+    def _group_candidates(self, g, u, norm_u, k):
+        """Yield (score, row) for group g in non-increasing score order; k is u's dot product with the group flags."""
+        lo, hi = int(self.group_starts[g]), int(self.group_starts[g + 1])
+        prices = self.z_price[lo:hi]
+        n = hi - lo
+        flag_norm2 = float(self.group_flag_norm2[g])
+        u_price = float(u[0])
+
+        def score(i):
+            p = float(prices[i])
+            denom = norm_u * math.sqrt(p * p + flag_norm2)
+            return (u_price * p + k) / denom if denom > 0 else 0.0
+
+        if k > 0:
+            # Single peak at p* = u_p * B / k: walk outwards from it
+            right = int(np.searchsorted(prices, u_price * flag_norm2 / k))
+            left = right - 1
+            while left >= 0 or right < n:
+                if right >= n or (left >= 0 and score(left) >= score(right)):
+                    yield score(left), int(self.order[lo + left])
+                    left -= 1
+                else:
+                    yield score(right), int(self.order[lo + right])
+                    right += 1
+        else:
+            # Valley or monotone: the best products sit at the ends
+            left, right = 0, n - 1
+            while left <= right:
+                if score(left) >= score(right):
+                    yield score(left), int(self.order[lo + left])
+                    left += 1
+                else:
+                    yield score(right), int(self.order[lo + right])
+                    right -= 1
+
+    def top_k(self, user_product, k=5):
+        """Return (rows, scores) of the k most similar products, best first.
+
+        Equal scores are ordered by descending row number, which is how the
+        dashboard's reversed argsort used to break ties.
+        """
+        u = self.transform(user_product)
+        return self._top_k_standardized(u, self.group_flags @ u[1:], k)
+
+    def top_k_many(self, values, k=5):
+        """top_k for each row of an (n, len(SIMILARITY_FEATURES)) array; returns a list of (rows, scores).
+
+        The queries are standardized and scored against every group's flag
+        vector in one matrix product, so a batch costs one BLAS call plus the
+        per-query heap merge.
+        """
+        U = self.transform_many(values)
+        group_dots = U[:, 1:] @ self.group_flags.T
+        return [self._top_k_standardized(u, dots, k) for u, dots in zip(U, group_dots)]
+
+    def _top_k_standardized(self, u, group_dots, k):
+        norm_u = float(np.sqrt(u @ u))
+        if k <= 0 or len(self.order) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        streams = [self._group_candidates(g, u, norm_u, float(group_dots[g])) for g in range(len(self.group_flags))]
+        heap = []
+        for g, stream in enumerate(streams):
+            first = next(stream, None)
+            if first is not None:
+                heap.append((-first[0], -first[1], g))
+        heapq.heapify(heap)
+
+        picked = []
+        while heap:
+            neg_score, neg_row, g = heapq.heappop(heap)
+            # Keep collecting past k while scores tie with the k-th so the tie-break is exact
+            if len(picked) >= k and -neg_score < picked[k - 1][0]:
+                break
+            picked.append((-neg_score, -neg_row))
+            nxt = next(streams[g], None)
+            if nxt is not None:
+                heapq.heappush(heap, (-nxt[0], -nxt[1], g))
+
+        picked.sort(key=lambda item: (-item[0], -item[1]))
+        picked = picked[:k]
+        rows = np.array([row for _, row in picked], dtype=np.int64)
+        scores = np.array([s for s, _ in picked])
+        return rows, scores
+
+
+def top_k_dense(similarities, k=5):
+    """Top-k of a dense similarity vector with argpartition instead of a full sort."""
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    # Everything tied with the k-th score is kept so ties resolve by descending row number
+    kth_score = -np.partition(-similarities, k - 1)[k - 1]
+    candidates = np.flatnonzero(similarities >= kth_score)
+    return candidates[np.lexsort((-candidates, -similarities[candidates]))][:k]
+
+
+def load_or_build_index(products_df, version, index_dir=INDEX_DIR):
+    """Load the persisted index for this catalog version, building and saving it on first use."""
+    path = os.path.join(index_dir, f"{version}.npz")
+    if os.path.exists(path):
+        return SimilarityIndex.load(path)
+    index = SimilarityIndex.build(products_df)
+    index.save(path)
+    return index
@@ -0,0 +1,185 @@
+"""Per-rerun timing spans, written to a local JSON-lines trace file.
+
+A trace covers one dashboard rerun (or one fragment rerun). Inside it,
+``span(name, **attrs)`` times a stage and records any attributes the stage
+adds, such as cache hit/miss or LLM token counts:
+
+    with trace("rerun") as current:
+        with span("load_data"):
+            ...
+        with span("find_similar_products", cache="hit"):
+            ...   # annotate(cache="miss") inside the cached function body
+
+When the trace ends it is appended to ``TRACE_PATH`` as one JSON line.
+Spans opened outside any trace (the batch runner, the benchmarks) do nothing,
+and ``TRACE_ENABLED=0`` turns tracing off entirely. A span is a couple of
+perf_counter calls and a dict, so tracing can stay on in production.
+
+Functions that can run on their own, like Streamlit fragments, are wrapped
+with ``@traced(name)``: a trace when they rerun alone, a span of the
+surrounding trace otherwise. The current trace lives in a context variable;
+work submitted to a thread pool joins it when run with
+``contextvars.copy_context().run``.
+"""
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+TRACE_PATH = os.environ.get("TRACE_PATH", os.path.join(".cache", "traces.jsonl"))
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "1") != "0"
+# The trace file is rotated to <path>.1 once it grows past this size
+TRACE_MAX_BYTES = 50 * 2**20
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+# Traces started by this process so far; 1 marks the cold-start rerun
+_sequence = itertools.count(1)
+
+
+class Trace:
+    """Spans recorded during one rerun, in completion order."""
+
+    def __init__(self, name, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.process_sequence = next(_sequence)
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda record: record["start_ms"])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "pid": os.getpid(),
+            "process_sequence": self.process_sequence,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+def current_trace():
+    """The trace of the running rerun, or None outside one."""
+    return _current_trace.get()
+
+
+def _reset(var, token):
+    try:
+        var.reset(token)
+    except ValueError:
+        # A generator closed from another context (e.g. garbage collected on
+        # a different thread) has nothing left to restore
+        pass
+
+
+def write_trace(finished, path=TRACE_PATH):
+    """Append a finished trace to path as one JSON line."""
+    line = json.dumps(finished.to_dict(), default=str) + "\n"
+    directory = os.path.dirname(path)
+    with _write_lock:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            if os.path.getsize(path) > TRACE_MAX_BYTES:
+                os.replace(path, path + ".1")
+        except OSError:
+            pass
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time the with-block as a span of the current trace; yields its (mutable) record."""
+    current = _current_trace.get()
+    if current is None:
+        yield dict(attrs)
+        return
+    parent = _current_span.get()
+    record = {
+        "id": current.next_id(),
+        "parent": parent["id"] if parent else None,
+        "name": name,
+        "start_ms": round(current.elapsed_ms(), 3),
+        **attrs,
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as exc:
+        record["error"] = type(exc).__name__
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        _reset(_current_span, token)
+        current.add(record)
+
+
+@contextlib.contextmanager
+def trace(name, path=TRACE_PATH, **attrs):
+    """Start a trace written to path on exit; inside an existing trace this is just a span."""
+    if _current_trace.get() is not None:
+        with span(name, **attrs):
+            yield _current_trace.get()
+        return
+    if not TRACE_ENABLED:
+        yield None
+        return
+    current = Trace(name, **attrs)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(None)
+    try:
+        yield current
+    except BaseException as exc:
+        current.attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        current.duration_ms = round(current.elapsed_ms(), 3)
+        _reset(_current_span, span_token)
+        _reset(_current_trace, trace_token)
+        write_trace(current, path)
+
+
+def annotate(**attrs):
+    """Add attributes to the innermost open span (no-op outside a trace)."""
+    record = _current_span.get()
+    if record is not None:
+        record.update(attrs)
+
+
+def traced(name):
+    """Decorator running the function inside trace(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,222 @@
+"""Hyperparameter search with k-fold cross-validation for the demand model.
+
+Samples configurations from ``SEARCH_SPACE`` (the current defaults are always
+the first candidate), and scores each one by k-fold cross-validation. Every
+fit uses the histogram tree method and early stopping on a slice of its
+training fold, so the validation fold is only ever used for scoring. The
+(configuration, fold) fits are spread over a process pool, and each worker's
+XGBoost is limited to its share of the cores, so workers x threads never
+exceeds the machine.
+
+The best configuration, with the boosting rounds early stopping settled on
+and its CV metrics, is written to ``<registry>/tuning.json``.
+model_registry.train_model trains with it from then on; --train also
+registers a new model version with it right away.
+
+    python tune.py                                  # 30 configurations, 5 folds, all cores
+    python tune.py --trials 60 --folds 3 --workers 4 --train
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from catalog_store import load_shared_clean, temp_path
+from forecasting import TRAINING_COLUMNS
+from model_registry import (
+    DEFAULT_PARAMS, REGISTRY_DIR, TARGET_COLUMN, TUNING_FILE, dataset_fingerprint, train_model,
+)
+from retrain import acquire_lock, release_lock
+
+SEARCH_SPACE = {
+    "max_depth": [3, 4, 5, 6, 8],
+    "learning_rate": [0.02, 0.05, 0.1, 0.2],
+    "min_child_weight": [1, 3, 5, 10],
+    "subsample": [0.6, 0.8, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "reg_lambda": [0.1, 1.0, 10.0],
+}
+# XGBoost's own defaults for the searched parameters DEFAULT_PARAMS leaves unset
+XGBOOST_DEFAULTS = {"min_child_weight": 1, "subsample": 1.0, "colsample_bytree": 1.0, "reg_lambda": 1.0}
+N_TRIALS = 30
+N_FOLDS = 5
+MAX_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+# Share of each training fold held back to decide when to stop boosting
+EARLY_STOPPING_FRACTION = 0.1
+
+# Per-process training data, filled in by _init_worker
+_worker = {}
+
+
+def sample_configs(n_trials=N_TRIALS, seed=0):
+    """The default configuration followed by n_trials - 1 distinct random draws from SEARCH_SPACE."""
+    rng = np.random.default_rng(seed)
+    defaults = {name: DEFAULT_PARAMS.get(name, XGBOOST_DEFAULTS.get(name)) for name in SEARCH_SPACE}
+    configs, seen = [defaults], {tuple(sorted(defaults.items()))}
+    size = int(np.prod([len(values) for values in SEARCH_SPACE.values()]))
+    while len(configs) < min(n_trials, size):
+        config = {name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}
+        key = tuple(sorted(config.items()))
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def kfold_indices(n_rows, n_folds=N_FOLDS, seed=42):
+    """(fit, early-stopping, validation) position arrays for shuffled k-fold cross-validation."""
+    order = np.random.default_rng(seed).permutation(n_rows)
+    folds = np.array_split(order, n_folds)
+    splits = []
+    for i in range(n_folds):
+        # The training folds are already shuffled, so their tail is a random early-stopping sample
+        train = np.concatenate(folds[:i] + folds[i + 1:])
+        n_stop = max(1, int(len(train) * EARLY_STOPPING_FRACTION))
+        splits.append((train[:-n_stop], train[-n_stop:], folds[i]))
+    return splits
+
+
+def _init_worker(threads):
+    # Each worker converts the memory-mapped columns into its own float32 matrix once, not once per fit
+    clean_data = load_shared_clean()
+    _worker.update(
+        X=clean_data[TRAINING_COLUMNS].to_numpy(dtype=np.float32),
+        y=clean_data[TARGET_COLUMN].to_numpy(dtype=np.float64),
+        threads=threads,
+    )
+
+
+def fit_fold(config, fit_idx, stop_idx, valid_idx):
+    """Fit config on one fold, stopping on stop_idx; return its metrics on the unseen valid_idx."""
+    from sklearn.metrics import mean_squared_error, r2_score
+    from xgboost import XGBRegressor
+
+    X, y = _worker["X"], _worker["y"]
+    model = XGBRegressor(
+        **config,
+        n_estimators=MAX_ROUNDS,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        tree_method="hist",
+        n_jobs=_worker["threads"],
+        random_state=DEFAULT_PARAMS["random_state"],
+    )
+    model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stop_idx], y[stop_idx])], verbose=False)
+    y_pred = model.predict(X[valid_idx])
+    return {
+        "mse": float(mean_squared_error(y[valid_idx], y_pred)),
+        "r2": float(r2_score(y[valid_idx], y_pred)),
+        "rounds": int(model.best_iteration) + 1,
+    }
+
+
+def summarize(config, fold_metrics):
+    """Mean and spread of a configuration's fold metrics."""
+    mse = np.array([m["mse"] for m in fold_metrics])
+    r2 = np.array([m["r2"] for m in fold_metrics])
+    rounds = np.array([m["rounds"] for m in fold_metrics])
+    return {
+        "config": config,
+        "mse_mean": float(mse.mean()),
+        "mse_std": float(mse.std()),
+        "rmse_mean": float(np.sqrt(mse).mean()),
+        "r2_mean": float(r2.mean()),
+        "r2_std": float(r2.std()),
+        "rounds_mean": float(rounds.mean()),
+        "folds": fold_metrics,
+    }
+
+
+def run_search(n_rows, configs, n_folds=N_FOLDS, workers=None):
+    """Cross-validate every configuration on a process pool; return summaries, best first."""
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    folds = kfold_indices(n_rows, n_folds)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        # One job per (configuration, fold) keeps the pool busy until the last fit
+        futures = [
+            [pool.submit(fit_fold, config, *split) for split in folds]
+            for config in configs
+        ]
+        summaries = [
+            summarize(config, [future.result() for future in fold_futures])
+            for config, fold_futures in zip(configs, futures)
+        ]
+    return sorted(summaries, key=lambda summary: summary["mse_mean"])
+
+
+def best_params(summary):
+    """XGBRegressor parameters for the full-data fit of a cross-validated configuration."""
+    return {
+        **summary["config"],
+        "n_estimators": max(1, int(round(summary["rounds_mean"]))),
+        "tree_method": "hist",
+        "random_state": DEFAULT_PARAMS["random_state"],
+    }
+
+
+def save_tuning(result, registry_dir=REGISTRY_DIR):
+    os.makedirs(registry_dir, exist_ok=True)
+    path = os.path.join(registry_dir, TUNING_FILE)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def tune(n_trials=N_TRIALS, n_folds=N_FOLDS, workers=None, seed=0, registry_dir=REGISTRY_DIR):
+    """Search, persist the best configuration and return the tuning record."""
+    clean_data = load_shared_clean()
+    start = time.perf_counter()
+    configs = sample_configs(n_trials, seed)
+    summaries = run_search(len(clean_data), configs, n_folds, workers)
+    best = summaries[0]
+    baseline = next(s for s in summaries if s["config"] == configs[0])
+    result = {
+        "created_at": time.time(),
+        "seconds": time.perf_counter() - start,
+        "dataset_fingerprint": dataset_fingerprint(clean_data),
+        "n_rows": len(clean_data),
+        "n_folds": n_folds,
+        "params": best_params(best),
+        "cv": {key: value for key, value in best.items() if key != "config"},
+        "baseline_cv": {key: value for key, value in baseline.items() if key not in ("config", "folds")},
+        "trials": [{key: value for key, value in s.items() if key != "folds"} for s in summaries],
+    }
+    save_tuning(result, registry_dir)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the demand model.")
+    parser.add_argument("--trials", type=int, default=N_TRIALS)
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    parser.add_argument("--train", action="store_true", help="register a model trained with the best configuration")
+    args = parser.parse_args(argv)
+
+    result = tune(args.trials, args.folds, args.workers, args.seed, args.registry_dir)
+    cv, baseline = result["cv"], result["baseline_cv"]
+    print(f"{len(result['trials'])} configurations x {args.folds} folds in {result['seconds']:.1f}s")
+    print(f"best: {json.dumps(result['params'])}")
+    print(f"  cv mse {cv['mse_mean']:.1f} ± {cv['mse_std']:.1f}, r2 {cv['r2_mean']:.3f} ± {cv['r2_std']:.3f}")
+    print(f"defaults: cv mse {baseline['mse_mean']:.1f}, r2 {baseline['r2_mean']:.3f}")
+
+    if args.train:
+        if not acquire_lock(args.registry_dir):
+            raise SystemExit("another retrain holds the registry lock")
+        try:
+            version, _ = train_model(load_shared_clean(), result["params"], args.registry_dir, tuning=result["cv"])
+        finally:
+            release_lock(args.registry_dir)
+        print(f"registered {version}")
+
+
+if __name__ == "__main__":
+    main()